@@ -0,0 +1,49 @@
+"""Which vendors and venues are already booked at a given time.
+
+An event occupies ``[reminder_date, ends_at)``. Two events overlap when each
+starts before the other ends. Because no event may last longer than
+``max_duration``, every event overlapping ``[start, end)`` starts inside
+``(start - max_duration, end)``, so each check is a bounded range scan of
+the ``(provider, reminder_date)`` indexes. Its cost depends on the bookings
+around that time, never on a provider's whole history.
+"""
+from sqlalchemy import and_, or_, select
+
+
+class Availability:
+    def __init__(self, event_table, max_duration):
+        self.table = event_table
+        self.max_duration = max_duration
+
+    def _overlapping(self, start, end):
+        ev = self.table
+        return and_(ev.c.reminder_date > start - self.max_duration, ev.c.reminder_date < end, ev.c.ends_at > start)
+
+    def busy_providers(self, conn, start, end):
+        """Emails of every vendor and venue owner booked during ``[start, end)``"""
+        ev = self.table
+        busy = set()
+        for vendor_email, venue_owner_email in conn.execute(
+                select(ev.c.vendor_email, ev.c.venue_owner_email).where(self._overlapping(start, end))):
+            busy.update((vendor_email, venue_owner_email))
+        busy.discard(None)
+        return busy
+
+    def conflicts(self, conn, start, end, vendor_email=None, venue_owner_email=None):
+        """Events booking the given vendor or venue owner during ``[start, end)``.
+
+        A locking read: under REPEATABLE READ a plain SELECT could use a read
+        view taken before the caller locked the providers, and miss a booking
+        committed while it waited.
+        """
+        ev = self.table
+        by_provider = [column == email for column, email in
+                       ((ev.c.vendor_email, vendor_email), (ev.c.venue_owner_email, venue_owner_email)) if email]
+        if not by_provider:
+            return []
+        return conn.execute(
+            select(ev.c.id, ev.c.title, ev.c.vendor_email, ev.c.venue_owner_email, ev.c.reminder_date, ev.c.ends_at)
+            .where(or_(*by_provider), self._overlapping(start, end))
+            .order_by(ev.c.reminder_date)
+            .with_for_update()
+        ).all()
@@ -0,0 +1,329 @@
+"""End-to-end benchmark of the core user flow.
+
+Seeds a database with background users, providers, events and invitations,
+then drives the real Flask routes with concurrent virtual users, each walking
+through
+
+    register -> login -> select_event_type -> select_providers ->
+    select_provider -> create_event -> add_invitation (xN) -> send_invitations
+
+against a stub SMTP server. Afterwards the invitation worker drains the
+queued jobs so delivery throughput is measured too. Every request is timed
+on its own (redirects are not followed) and reported per route.
+
+    python benchmarks/bench_flow.py --virtual-users 500 --concurrency 50
+    python benchmarks/bench_flow.py --save baseline.json
+    python benchmarks/bench_flow.py --compare baseline.json
+
+DATABASE_URL selects the database (default: a temporary SQLite file); with
+--compare, routes whose p95 got more than --tolerance percent slower are
+flagged and the exit status is 1.
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_stub import StubSMTPServer  # noqa: E402
+
+PASSWORD = 'bench-flow'
+EVENT_TYPES = ('Wedding', 'Birthday', 'Conference', 'Concert')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class VirtualUser:
+    """One browser: its own cookie jar, timing every request it makes"""
+
+    def __init__(self, base_url, stats):
+        self.base_url = base_url
+        self.stats = stats
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+
+    def request(self, route, path, data=None, headers=None, expect_location=None):
+        """Time one request; returns (status, Location header, body).
+
+        With ``expect_location``, a response that doesn't redirect to a URL
+        containing it counts as an error.
+        """
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                status, location, content = response.status, None, response.read()
+        except urllib.error.HTTPError as e:
+            status, location, content = e.code, e.headers.get('Location'), e.read()
+        except OSError as e:
+            self.stats.record(route, time.perf_counter() - started, error=type(e).__name__)
+            return None, None, b''
+        error = f'HTTP {status}' if status >= 400 else None
+        if error is None and expect_location and expect_location not in (location or ''):
+            error = f'redirected to {urllib.parse.urlsplit(location or "").path or "nowhere"}'
+        self.stats.record(route, time.perf_counter() - started, error=error)
+        return status, location, content
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, elapsed, error=None):
+        with self.lock:
+            if error:
+                self.errors[route][error] += 1
+            else:
+                self.samples[route].append(elapsed)
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in sorted(set(self.samples) | set(self.errors)):
+            samples = sorted(self.samples.get(route, ()))
+            routes[route] = {
+                'requests': len(samples),
+                'errors': sum(self.errors.get(route, {}).values()),
+                'rps': len(samples) / elapsed,
+                'p50_ms': percentile(samples, 50) * 1000,
+                'p95_ms': percentile(samples, 95) * 1000,
+                'p99_ms': percentile(samples, 99) * 1000,
+                'max_ms': (samples[-1] if samples else 0) * 1000,
+            }
+        return routes
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(app_module, users, providers, events, invitations):
+    """Background data the flow runs against, inserted in bulk"""
+    from werkzeug.security import generate_password_hash
+
+    app, db = app_module.app, app_module.db
+    User, Event, Invitation = app_module.User, app_module.Event, app_module.Invitation
+    rng = random.Random(5)
+    password = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+    with app.app_context():
+        db.create_all()
+        rows = []
+        for i in range(providers):
+            rows.append({'name': f'Vendor {i}', 'email': f'vendor{i}@bench.test', 'password': password,
+                         'role': 'Vendor', 'services': rng.choice(('Catering', 'Decoration', 'Music, Lighting')),
+                         'phone': '555-0100'})
+            rows.append({'name': f'Venue {i}', 'email': f'venue{i}@bench.test', 'password': password,
+                         'role': 'Venue Owner', 'venue_lat': rng.uniform(8, 35), 'venue_lng': rng.uniform(68, 97),
+                         'venue_address': f'{i} Main Road', 'phone': '555-0101'})
+        for i in range(users):
+            rows.append({'name': f'Client {i}', 'email': f'client{i}@bench.test', 'password': password,
+                         'role': 'User'})
+        db.session.execute(db.insert(User), rows)
+
+        event_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(events)]
+        start = datetime(2030, 1, 1)
+        rows = []
+        for n, event_id in enumerate(event_ids):
+            client, vendor, venue = rng.randrange(max(users, 1)), rng.randrange(providers), rng.randrange(providers)
+            rows.append({'id': event_id, 'title': f'Event {n}', 'description': 'Seeded event.',
+                         'event_type': rng.choice(EVENT_TYPES), 'user_email': f'client{client}@bench.test',
+                         'user_name': f'Client {client}', 'vendor_email': f'vendor{vendor}@bench.test',
+                         'vendor_name': f'Vendor {vendor}', 'venue_owner_email': f'venue{venue}@bench.test',
+                         'venue_owner_name': f'Venue {venue}', 'reminder_date': start + timedelta(hours=n)})
+        for chunk in range(0, len(rows), 5000):
+            db.session.execute(db.insert(Event.__table__), rows[chunk:chunk + 5000])
+
+        rows = []
+        per_event = {}
+        for n in range(invitations if event_ids else 0):
+            event_id = event_ids[n % len(event_ids)]
+            per_event[event_id] = per_event.get(event_id, 0) + 1
+            rows.append({'event_id': event_id, 'guest_name': f'Guest {n}',
+                         'guest_email': f'guest{n}@bench.test', 'invitation_sent': True})
+        for chunk in range(0, len(rows), 5000):
+            db.session.execute(db.insert(Invitation), rows[chunk:chunk + 5000])
+        # Seeded invitations are all sent; keep the event counters consistent
+        event = Event.__table__
+        db.session.execute(
+            db.update(event).where(event.c.id == db.bindparam('event_id')).values(
+                invitation_total_count=db.bindparam('count'), invitation_sent_count=db.bindparam('count')),
+            [{'event_id': event_id, 'count': count} for event_id, count in per_event.items()]
+        )
+        db.session.commit()
+
+
+def user_flow(base_url, stats, n, run_id, starts_at, providers, guests):
+    user = VirtualUser(base_url, stats)
+    email = f'flow{run_id}-{n}@bench.test'
+    rng = random.Random(n)
+    user.request('register', '/register', {'name': f'Flow User {n}', 'email': email, 'password': PASSWORD,
+                                           'role': 'User'})
+    user.request('login', '/login', {'email': email, 'password': PASSWORD})
+    user.request('select_event_type', '/select_event_type')
+    user.request('select_providers [POST]', '/select_providers', {'event_type': rng.choice(EVENT_TYPES)})
+    user.request('select_providers', '/select_providers')
+    user.request('select_provider', '/select_provider', {
+        'vendor_email': f'vendor{rng.randrange(providers)}@bench.test',
+        'venue_owner_email': f'venue{rng.randrange(providers)}@bench.test',
+    })
+    _, location, _ = user.request('create_event', '/create_event', {
+        'title': f'Flow event {n}', 'description': 'Created by the flow benchmark.',
+        'reminder_date': starts_at.strftime('%Y-%m-%dT%H:%M'),
+    }, expect_location='/event/')
+    if not location or '/event/' not in location:
+        return
+    event_id = urllib.parse.urlsplit(location).path.split('/')[2]
+    for g in range(guests):
+        user.request('add_invitation', f'/event/{event_id}/add_invitation',
+                     {'guest_name': f'Guest {g}', 'guest_email': f'flow{run_id}-{n}-{g}@guest.test'})
+    user.request('send_invitations', f'/event/{event_id}/send_invitations', {},
+                 headers={'Accept': 'application/json'})
+
+
+def flow_start_times(event_ease, flows):
+    """A start time per flow, after every existing event and far enough apart
+    that no two bookings overlap, whatever providers the flows pick
+    (create_event rejects double bookings)"""
+    spacing = timedelta(hours=event_ease.EVENT_MAX_DURATION_HOURS)
+    with event_ease.app.app_context():
+        latest = event_ease.db.session.query(event_ease.db.func.max(event_ease.Event.reminder_date)).scalar()
+    start = (max(latest or datetime.min, datetime(2031, 1, 1)) + spacing).replace(minute=0, second=0, microsecond=0)
+    return [start + n * spacing for n in range(flows)]
+
+
+def drain_jobs(worker_module, app):
+    """Run the invitation worker until no job is runnable; returns seconds taken"""
+    started = time.perf_counter()
+    while True:
+        with app.app_context():
+            if not worker_module.run_once():
+                break
+    return time.perf_counter() - started
+
+
+def print_report(routes, compare=None, tolerance=20.0):
+    print(f'{"route":<26}{"requests":>9}{"errors":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+          f'{"p99 ms":>9}{"max ms":>9}{"p95 vs base":>13}')
+    regressions = []
+    for route, r in routes.items():
+        change = ''
+        base = (compare or {}).get(route)
+        if base and base['p95_ms']:
+            delta = (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            change = f'{delta:+.0f}%'
+            if delta > tolerance:
+                regressions.append(route)
+                change += ' !'
+        print(f'{route:<26}{r["requests"]:>9}{r["errors"]:>8}{r["rps"]:>9.1f}{r["p50_ms"]:>9.1f}'
+              f'{r["p95_ms"]:>9.1f}{r["p99_ms"]:>9.1f}{r["max_ms"]:>9.1f}{change:>13}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--virtual-users', type=int, default=200, help='flows to run')
+    parser.add_argument('--concurrency', type=int, default=50, help='flows running at once')
+    parser.add_argument('--guests', type=int, default=5, help='add_invitation calls per flow')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--seed-providers', type=int, default=200, help='vendors and venue owners (each)')
+    parser.add_argument('--seed-events', type=int, default=10000)
+    parser.add_argument('--seed-invitations', type=int, default=50000)
+    parser.add_argument('--smtp-latency', type=float, default=0.001, help='stub delay per SMTP command')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON written by --save')
+    parser.add_argument('--tolerance', type=float, default=20.0, help='allowed p95 slowdown, percent')
+    args = parser.parse_args()
+
+    # The app reads its SMTP and database settings at import time
+    smtp = StubSMTPServer(latency=args.smtp_latency).start()
+    os.environ.update({
+        'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': str(smtp.port), 'SMTP_USE_TLS': '0',
+        'EMAIL_ADDRESS': 'bench@eventease.test', 'EMAIL_PASSWORD': 'secret',
+    })
+    fresh_database = 'DATABASE_URL' not in os.environ
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_flow.db'))
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+    import app as event_ease
+    import worker
+    from werkzeug.serving import make_server
+
+    if fresh_database:
+        print(f'Seeding {args.seed_users} users, {args.seed_providers * 2} providers, '
+              f'{args.seed_events} events, {args.seed_invitations} invitations...')
+        seed(event_ease, args.seed_users, args.seed_providers, args.seed_events, args.seed_invitations)
+    else:
+        with event_ease.app.app_context():
+            event_ease.db.create_all()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, event_ease.app, threaded=True)
+    server.request_queue_size = args.concurrency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    starts = flow_start_times(event_ease, args.virtual_users)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for future in [pool.submit(user_flow, base_url, stats, n, run_id, starts[n], args.seed_providers,
+                                   args.guests)
+                       for n in range(args.virtual_users)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    delivered_before = smtp.messages
+    delivery_seconds = drain_jobs(worker, event_ease.app)
+    delivered = smtp.messages - delivered_before
+    smtp.stop()
+
+    routes = stats.summary(elapsed)
+    total = sum(r['requests'] for r in routes.values())
+    print(f'{args.virtual_users} flows, concurrency {args.concurrency}, {elapsed:.1f}s, {total} requests, '
+          f'{total / elapsed:.0f} req/s, {args.virtual_users / elapsed:.1f} flows/s')
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['routes']
+    regressions = print_report(routes, baseline, args.tolerance)
+    print(f'Invitation delivery: {delivered} messages in {delivery_seconds:.2f}s '
+          f'({delivered / delivery_seconds if delivery_seconds else 0:.0f}/s)')
+    for route, errors in stats.errors.items():
+        print(f'errors on {route}: {dict(errors)}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'args': vars(args), 'elapsed': elapsed, 'routes': routes,
+                       'delivery': {'messages': delivered, 'seconds': delivery_seconds}}, f, indent=2)
+        print(f'Results written to {args.save}')
+    if regressions:
+        print(f'p95 regressions over {args.tolerance:.0f}%: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Lookup-query latency before and after the secondary/composite indexes.
+
+Seeds a SQLite database (or the database named by --url) with users, events
+and invitations, times the hot lookups on the un-indexed schema, applies the
+migrations in migrate.py and times them again.
+
+    python benchmarks/bench_indexes.py --events 1000000 --invitations 10000000
+
+The defaults are smaller so the benchmark finishes in a couple of minutes.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import sqlalchemy as sa
+
+# app.py needs these to import; the benchmark uses its own engine
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate  # noqa: E402
+from app import db, Event, Invitation, User  # noqa: E402
+
+QUERIES = {
+    'events by user_email': ('SELECT id, title FROM event WHERE user_email = :user', 'user'),
+    'events by vendor_email': ('SELECT id, title FROM event WHERE vendor_email = :vendor', 'vendor'),
+    'events by venue_owner_email': ('SELECT id, title FROM event WHERE venue_owner_email = :venue', 'venue'),
+    'users by role': ("SELECT id, name FROM user WHERE role = 'Venue Owner'", None),
+    'invitation by (event, guest)': ('SELECT id FROM invitation WHERE event_id = :event AND guest_email = :guest', 'guest'),
+    'unsent invitations of event': ('SELECT id FROM invitation WHERE event_id = :event AND invitation_sent = 0', 'event'),
+}
+
+
+def seed(engine, users, providers, events, invitations, batch=20000):
+    rng = random.Random(42)
+    user_emails = [f'user{i}@example.test' for i in range(users)]
+    vendor_emails = [f'vendor{i}@example.test' for i in range(providers)]
+    venue_emails = [f'venue{i}@example.test' for i in range(providers)]
+    event_ids = []
+
+    # Bound parameters through SQLAlchemy, so any driver's placeholder style works
+    people = [(e, 'User') for e in user_emails] + [(e, 'Vendor') for e in vendor_emails] + \
+             [(e, 'Venue Owner') for e in venue_emails]
+    with engine.begin() as conn:
+        conn.execute(sa.insert(User.__table__),
+                     [{'name': email.split('@')[0], 'email': email, 'password': 'x', 'role': role}
+                      for email, role in people])
+    for start in range(0, events, batch):
+        rows = []
+        for _ in range(min(batch, events - start)):
+            event_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            event_ids.append(event_id)
+            rows.append({'id': event_id, 'title': 'Event', 'description': 'Description', 'event_type': 'Wedding',
+                         'user_email': rng.choice(user_emails), 'vendor_email': rng.choice(vendor_emails),
+                         'venue_owner_email': rng.choice(venue_emails), 'reminder_date': datetime(2030, 1, 1, 10)})
+        with engine.begin() as conn:
+            conn.execute(sa.insert(Event.__table__), rows)
+    per_event = max(1, invitations // max(events, 1))
+    inserted = 0
+    while inserted < invitations:
+        rows = []
+        for _ in range(min(batch // per_event + 1, (invitations - inserted) // per_event + 1)):
+            event_id = event_ids[(inserted // per_event) % len(event_ids)]
+            for g in range(per_event):
+                if inserted >= invitations:
+                    break
+                rows.append({'event_id': event_id, 'guest_name': f'Guest {g}',
+                             'guest_email': f'guest{inserted}@example.test',
+                             'invitation_sent': rng.random() < 0.5, 'send_attempts': 0})
+                inserted += 1
+        with engine.begin() as conn:
+            conn.execute(sa.insert(Invitation.__table__), rows)
+    # Counters as the app keeps them
+    with engine.begin() as conn:
+        conn.execute(sa.text(
+            'UPDATE event SET '
+            'invitation_total_count = (SELECT COUNT(*) FROM invitation WHERE invitation.event_id = event.id), '
+            'invitation_sent_count = (SELECT COUNT(*) FROM invitation '
+            'WHERE invitation.event_id = event.id AND invitation.invitation_sent = :sent)'), {'sent': True})
+    return user_emails, vendor_emails, venue_emails
+
+
+def sample_params(engine, kind, emails, rng):
+    users, vendors, venues = emails
+    if kind == 'user':
+        return {'user': rng.choice(users)}
+    if kind == 'vendor':
+        return {'vendor': rng.choice(vendors)}
+    if kind == 'venue':
+        return {'venue': rng.choice(venues)}
+    with engine.connect() as conn:
+        row = conn.execute(sa.text('SELECT event_id, guest_email FROM invitation WHERE id = :id'),
+                           {'id': rng.randint(1, 1000)}).one()
+    return {'event': row.event_id, 'guest': row.guest_email}
+
+
+def time_queries(engine, emails, repeats):
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as conn:
+        for label, (sql, kind) in QUERIES.items():
+            samples = []
+            for _ in range(repeats):
+                params = sample_params(engine, kind, emails, rng) if kind else {}
+                started = time.perf_counter()
+                conn.execute(sa.text(sql), params).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--providers', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--invitations', type=int, default=1000000)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_indexes.db")}'
+    engine = sa.create_engine(url)
+
+    # Recreate the pre-index schema: tables only, no secondary indexes
+    db.metadata.create_all(engine)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(engine, checkfirst=True)
+
+    started = time.perf_counter()
+    emails = seed(engine, args.users, args.providers, args.events, args.invitations)
+    print(f'Seeded {args.events} events / {args.invitations} invitations in {time.perf_counter() - started:.0f}s')
+
+    before = time_queries(engine, emails, args.repeats)
+    started = time.perf_counter()
+    migrate.run(engine, verbose=False)
+    print(f'Applied index migrations in {time.perf_counter() - started:.1f}s')
+    after = time_queries(engine, emails, args.repeats)
+
+    print(f'{"query (median ms)":<32}{"before":>12}{"after":>12}{"speedup":>10}')
+    for label in QUERIES:
+        print(f'{label:<32}{before[label]:>12.3f}{after[label]:>12.3f}{before[label] / max(after[label], 1e-6):>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
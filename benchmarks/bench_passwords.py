@@ -0,0 +1,83 @@
+"""Password verifications per second at each hashing cost.
+
+Runs ``PasswordHasher.verify`` (what a login costs) from many request
+threads for a few seconds per method and reports verifications per second,
+per core and the p50/p95 time a login waits for its hash.
+
+    python benchmarks/bench_passwords.py
+    python benchmarks/bench_passwords.py --workers 2 --methods scrypt:16384:8:1 pbkdf2:sha256:600000
+
+--workers defaults to the number of CPUs; the pool never uses more cores than
+that, so per-core figures divide by min(workers, CPUs).
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import PasswordHasher, PasswordHasherBusy  # noqa: E402
+
+METHODS = (
+    'scrypt:32768:8:1',       # Werkzeug's default
+    'scrypt:16384:8:1',
+    'scrypt:8192:8:1',
+    'pbkdf2:sha256:600000',   # Werkzeug's pbkdf2 default
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:100000',
+)
+
+
+def run(method, workers, threads, seconds):
+    hasher = PasswordHasher(method, workers=workers, max_pending=threads)
+    stored = hasher.hash('correct horse battery staple')
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def login():
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                assert hasher.verify(stored, 'correct horse battery staple')
+            except PasswordHasherBusy:
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=login) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=METHODS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing pool size')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent logins')
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    cores = min(args.workers, os.cpu_count() or 1)
+    print(f'{args.workers} hashing workers on {os.cpu_count()} CPUs, {args.threads} concurrent logins')
+    print(f'{"method":<24}{"logins/s":>10}{"per core":>10}{"p50 ms":>10}{"p95 ms":>10}')
+    for method in args.methods:
+        rate, latencies = run(method, args.workers, args.threads, args.seconds)
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        print(f'{method:<24}{rate:>10.1f}{rate / cores:>10.1f}{p50:>10.1f}{p95:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Provider directory lookups vs. the old full-table provider scan.
+
+    python benchmarks/bench_providers.py --providers 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+# app.py needs these to import; the benchmark uses its own engine
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db, User  # noqa: E402
+from providers import Provider, ProviderDirectory  # noqa: E402
+
+SERVICES = ['Catering', 'Decoration', 'Photography', 'DJ', 'Lighting', 'Florist', 'Makeup', 'Security']
+
+
+def seed(engine, count):
+    rng = random.Random(1)
+    rows = []
+    for i in range(count):
+        venue = i % 2 == 0
+        rows.append({
+            'name': f'Provider {i}', 'email': f'p{i}@example.test', 'password': 'x',
+            'role': 'Venue Owner' if venue else 'Vendor', 'phone': '555-0100',
+            'services': None if venue else ', '.join(rng.sample(SERVICES, 3)),
+            # Roughly India-sized bounding box
+            'venue_lat': rng.uniform(8, 35) if venue else None,
+            'venue_lng': rng.uniform(68, 97) if venue else None,
+            'venue_address': f'{i} Main Road' if venue else None,
+        })
+    with engine.begin() as conn:
+        conn.execute(sa.insert(User.__table__), rows)
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = sa.create_engine(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_providers.db")}')
+    db.metadata.create_all(engine)
+    seed(engine, args.providers)
+    session = Session(engine)
+
+    def load():
+        rows = session.query(User.id, User.name, User.email, User.role, User.phone, User.services,
+                             User.venue_lat, User.venue_lng, User.venue_address)
+        return [Provider(*row) for row in rows.filter(User.role.in_(('Vendor', 'Venue Owner')))]
+
+    def full_scan():
+        session.expunge_all()
+        session.query(User).filter_by(role='Vendor').all()
+        session.query(User).filter_by(role='Venue Owner').all()
+
+    directory = ProviderDirectory(load)
+    started = time.perf_counter()
+    directory.snapshot()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(2)
+    print(f'{args.providers} providers; snapshot build {build_ms:.0f} ms (once per invalidation)')
+    print(f'{"lookup (median ms)":<40}{"ms":>10}')
+    print(f'{"old: two full role scans, ORM objects":<40}{timed(full_scan, 5):>10.2f}')
+    print(f'{"vendors page 1":<40}{timed(lambda: directory.vendors(page=1), args.repeats):>10.3f}')
+    print(f'{"vendors page 500":<40}{timed(lambda: directory.vendors(page=500), args.repeats):>10.3f}')
+    print(f'{"vendors matching photo":<40}{timed(lambda: directory.vendors("photo"), args.repeats):>10.3f}')
+    print(f'{"20 nearest venues within 25 km":<40}'
+          f'{timed(lambda: directory.nearest_venues(rng.uniform(8, 35), rng.uniform(68, 97), 25, 20), args.repeats):>10.3f}')
+    print(f'{"20 nearest venues within 100 km":<40}'
+          f'{timed(lambda: directory.nearest_venues(rng.uniform(8, 35), rng.uniform(68, 97), 100, 20), args.repeats):>10.3f}')
+    print(f'{"provider by email":<40}{timed(lambda: directory.get("p4242@example.test"), args.repeats):>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
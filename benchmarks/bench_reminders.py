@@ -0,0 +1,100 @@
+"""Reminder dispatcher query cost as the number of scheduled events grows.
+
+Seeds event_reminder rows spread over the past and next year (those in the
+past already done) and times the dispatcher's two queries at each size:
+finding due reminders to claim and finding when the next one is due. With the
+(status, due_at) index both should stay flat as the table grows.
+
+    python benchmarks/bench_reminders.py --sizes 10000 100000 500000
+
+DATABASE_URL selects the database (default: a temporary SQLite file). The
+query plans are printed for the largest size.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'reminders.db')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+import sqlalchemy as sa  # noqa: E402
+
+import migrate  # noqa: E402
+import reminders  # noqa: E402
+from app import app, db, Event, EventReminder  # noqa: E402
+
+
+def seed(engine, start, count, batch=20000):
+    """Add events start..start+count, each with its reminder"""
+    rng = random.Random(start)
+    now = datetime.utcnow()
+    for offset in range(start, start + count, batch):
+        events, rows = [], []
+        for i in range(offset, min(offset + batch, start + count)):
+            starts_at = now + timedelta(minutes=rng.randint(-525600, 525600))
+            due_at = starts_at - timedelta(hours=24)
+            events.append({'id': f'bench-{i}', 'title': 'Event', 'description': '', 'event_type': 'Wedding',
+                           'user_email': 'organizer@example.test', 'user_name': 'Organizer',
+                           'reminder_date': starts_at, 'updated_at': now})
+            rows.append({'event_id': f'bench-{i}', 'due_at': due_at, 'status': 'done' if due_at < now else 'pending',
+                         'organizer_sent': due_at < now, 'last_invitation_id': 0, 'sent_count': 0, 'failed_count': 0})
+        with engine.begin() as conn:
+            conn.execute(sa.insert(Event.__table__), events)
+            conn.execute(sa.insert(EventReminder.__table__), rows)
+
+
+def timed(fn, repeat=200):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+        db.session.rollback()
+    return statistics.median(samples) * 1e6
+
+
+def due_candidates():
+    now = datetime.utcnow()
+    return db.session.query(EventReminder.id).filter(
+        EventReminder.status == 'pending', EventReminder.due_at <= now,
+        db.or_(EventReminder.lease_expires_at == None, EventReminder.lease_expires_at < now)
+    ).order_by(EventReminder.due_at).limit(10).all()
+
+
+def explain(engine):
+    now = datetime.utcnow().isoformat(' ')
+    prefix = 'EXPLAIN QUERY PLAN' if engine.dialect.name == 'sqlite' else 'EXPLAIN'
+    for label, query in (
+            ('due', f"SELECT id FROM event_reminder WHERE status = 'pending' AND due_at <= '{now}' "
+                    'ORDER BY due_at LIMIT 10'),
+            ('next', "SELECT MIN(due_at) FROM event_reminder WHERE status = 'pending'")):
+        with engine.connect() as conn:
+            print(f'{label}:', [tuple(row) for row in conn.execute(sa.text(f'{prefix} {query}'))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    args = parser.parse_args()
+
+    with app.app_context():
+        migrate.run(db.engine, verbose=False)
+        print(f'{"events":>10}{"due us":>10}{"next us":>10}')
+        seeded = 0
+        for size in sorted(args.sizes):
+            seed(db.engine, seeded, size - seeded)
+            seeded = size
+            print(f'{size:>10}{timed(due_candidates):>10.0f}{timed(reminders.next_due_at):>10.0f}')
+        explain(db.engine)
+
+
+if __name__ == '__main__':
+    main()
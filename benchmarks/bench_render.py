@@ -0,0 +1,155 @@
+"""Invitation rendering throughput and peak RSS: legacy vs in-memory templates.
+
+The legacy path rebuilds the body f-string and the ICS for every guest,
+round-trips the ICS through a temporary file and encodes it with MIMEBase.
+The template path renders the event-invariant parts once per event.
+
+    python benchmarks/bench_render.py --invitations 10000
+
+Each mode runs in its own subprocess so peak RSS figures don't mix.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from email import encoders, message_from_string
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from invite_render import TemplateCache  # noqa: E402
+
+FROM_ADDR = 'events@eventease.test'
+
+
+def make_event():
+    return SimpleNamespace(
+        id='2f1d6a52-35c1-4c55-bb0e-4f0f3a1c2b7e', title='Annual Gala Dinner',
+        description='An evening of dinner, awards and music. ' * 20, event_type='Corporate',
+        reminder_date='2030-06-01T19:30', venue_address='12 Park Street, Bengaluru',
+        user_name='Asha Rao', user_email='asha@example.test', vendor_name='Spice Caterers',
+        vendor_services='Catering, Decoration',
+    )
+
+
+def make_guests(count):
+    return [SimpleNamespace(guest_name=f'Guest {i}', guest_email=f'guest{i}@example.test') for i in range(count)]
+
+
+def legacy_render(event, invitation):
+    """The pre-template implementation, kept verbatim for comparison"""
+    msg = MIMEMultipart()
+    msg['From'] = FROM_ADDR
+    msg['To'] = invitation.guest_email
+    msg['Subject'] = f"Invitation: {event.title}"
+    body = f"""
+        Dear {invitation.guest_name},
+
+        You're invited to: {event.title}
+
+        Event Details:
+        - Type: {event.event_type}
+        - Date & Time: {event.reminder_date}
+        - Venue: {event.venue_address if event.venue_address else 'TBD'}
+        - Organized by: {event.user_name}
+
+        Description:
+        {event.description}
+
+        Vendor: {event.vendor_name}
+        Services: {event.vendor_services}
+
+        Please find the calendar invitation attached to add this event to your calendar.
+
+        Best regards,
+        Event Ease Team
+        """
+    msg.attach(MIMEText(body, 'plain'))
+    event_datetime = datetime.strptime(event.reminder_date, '%Y-%m-%dT%H:%M')
+    end_datetime = event_datetime + timedelta(hours=2)
+    ics_content = f"""BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Event Ease//Event Invitation//EN
+BEGIN:VEVENT
+UID:{event.id}@eventeasy.com
+DTSTART:{event_datetime.strftime('%Y%m%dT%H%M%S')}
+DTEND:{end_datetime.strftime('%Y%m%dT%H%M%S')}
+SUMMARY:{event.title}
+DESCRIPTION:{event.description}
+LOCATION:{event.venue_address if event.venue_address else 'TBD'}
+ORGANIZER:CN={event.user_name}:MAILTO:{event.user_email}
+ATTENDEE:CN={invitation.guest_name}:MAILTO:{invitation.guest_email}
+STATUS:CONFIRMED
+SEQUENCE:0
+END:VEVENT
+END:VCALENDAR"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.ics', delete=False) as temp_file:
+        temp_file.write(ics_content)
+        temp_file_path = temp_file.name
+    with open(temp_file_path, 'rb') as attachment:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(attachment.read())
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename= {event.title.replace(" ", "_")}.ics')
+        msg.attach(part)
+    os.unlink(temp_file_path)
+    return msg.as_string()
+
+
+def template_render(cache):
+    return lambda event, invitation: cache.get(event).render(invitation.guest_name, invitation.guest_email)
+
+
+def check_equivalent(event, guest):
+    """Both paths must produce the same attachment and (modulo indentation) body"""
+    cache = TemplateCache(FROM_ADDR)
+    old = message_from_string(legacy_render(event, guest))
+    new = message_from_string(template_render(cache)(event, guest))
+    old_body, old_ics = [p.get_payload(decode=True) for p in old.get_payload()]
+    new_body, new_ics = [p.get_payload(decode=True) for p in new.get_payload()]
+    assert old_ics == new_ics, 'ICS attachments differ'
+    squash = lambda b: [line.strip() for line in b.decode().splitlines() if line.strip()]  # noqa: E731
+    assert squash(old_body) == squash(new_body), 'bodies differ'
+    assert new['To'] == guest.guest_email and new['Subject'] == old['Subject']
+
+
+def run_mode(mode, count):
+    event = make_event()
+    guests = make_guests(count)
+    render = legacy_render if mode == 'legacy' else template_render(TemplateCache(FROM_ADDR))
+    started = time.perf_counter()
+    total_bytes = 0
+    for guest in guests:
+        total_bytes += len(render(event, guest))
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{mode:<10}{elapsed:>10.2f}{count / elapsed:>12.0f}{peak_kb / 1024:>14.1f}{total_bytes / count:>12.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invitations', type=int, default=10000)
+    parser.add_argument('--mode', choices=('legacy', 'template'))
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.invitations)
+        return
+
+    check_equivalent(make_event(), make_guests(1)[0])
+    print(f'{args.invitations} invitations for one event')
+    print(f'{"mode":<10}{"seconds":>10}{"msg/s":>12}{"peak RSS MB":>14}{"bytes/msg":>12}')
+    sys.stdout.flush()
+    for mode in ('legacy', 'template'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, '--invitations', str(args.invitations)], check=True)
+
+
+if __name__ == '__main__':
+    main()
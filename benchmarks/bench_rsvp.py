@@ -0,0 +1,114 @@
+"""RSVP click burst: buffered batch writes versus a commit per click.
+
+Seeds one event with --guests invitations in a temporary SQLite database
+(or DATABASE_URL), then fires one accept/decline click per guest from
+--threads concurrent clients through the real /rsvp endpoint. The same burst
+is then written with one UPDATE + commit per click for comparison.
+
+    python benchmarks/bench_rsvp.py --guests 5000 --threads 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_rsvp.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, update  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app import app, db, Event, Invitation, User, rsvp_buffer, rsvp_tokens  # noqa: E402
+
+commits = 0
+
+
+@event.listens_for(Engine, 'commit')
+def count_commit(conn):
+    global commits
+    commits += 1
+
+
+def seed(guests):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(name='Host', email='host@bench.test', password='x', role='User'))
+        db.session.add(Event(id='bench-event', title='Launch', description='Announcement', event_type='Conference',
+                             user_email='host@bench.test', user_name='Host', reminder_date=datetime(2030, 1, 1)))
+        db.session.execute(db.insert(Invitation), [
+            {'event_id': 'bench-event', 'guest_name': f'Guest {i}', 'guest_email': f'guest{i}@bench.test'}
+            for i in range(guests)
+        ])
+        db.session.commit()
+        return [row.id for row in db.session.query(Invitation.id).order_by(Invitation.id)]
+
+
+def click_burst(ids, threads):
+    tokens = [rsvp_tokens.dumps(i) for i in ids]
+
+    def run(chunk):
+        client = app.test_client()
+        for n, token in enumerate(chunk):
+            client.post(f'/rsvp/{token}/{"decline" if n % 4 == 0 else "accept"}')
+
+    workers = [threading.Thread(target=run, args=(tokens[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    acknowledged = time.perf_counter() - started
+    while rsvp_buffer.flush():
+        pass
+    return acknowledged, time.perf_counter() - started
+
+
+def commit_per_click(ids, threads):
+    def run(chunk):
+        with app.app_context():
+            for n, invitation_id in enumerate(chunk):
+                with db.engine.begin() as conn:
+                    conn.execute(update(Invitation.__table__).where(Invitation.__table__.c.id == invitation_id)
+                                 .values(rsvp_status='declined' if n % 4 == 0 else 'accepted'))
+
+    workers = [threading.Thread(target=run, args=(ids[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guests', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    global commits
+    ids = seed(args.guests)
+    commits = 0
+    acknowledged, written = click_burst(ids, args.threads)
+    buffered_commits = commits
+    with app.app_context():
+        event_row = db.session.get(Event, 'bench-event')
+        counts = (event_row.rsvp_accepted_count, event_row.rsvp_declined_count)
+    print(f'{args.guests} clicks from {args.threads} clients')
+    print(f'buffered:         {args.guests / acknowledged:8.0f} clicks/s acknowledged, all written after '
+          f'{written:.2f}s in {buffered_commits} commits; counters accepted={counts[0]} declined={counts[1]}')
+
+    ids = seed(args.guests)
+    commits = 0
+    elapsed = commit_per_click(ids, args.threads)
+    print(f'commit per click: {args.guests / elapsed:8.0f} clicks/s written (database only, no HTTP), '
+          f'{commits} commits')
+
+
+if __name__ == '__main__':
+    main()
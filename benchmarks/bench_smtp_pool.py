@@ -0,0 +1,85 @@
+"""Throughput of the pooled SMTP delivery engine against a local stub server.
+
+Compares the legacy connect/STARTTLS/login/send/quit-per-message pattern with
+the pooled engine at 1, 4 and 16 connections.
+
+    python benchmarks/bench_smtp_pool.py --messages 2000 --latency 0.002
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mailer import DeliveryEngine, OutgoingMessage, SMTPConnectionPool  # noqa: E402
+from smtp_stub import StubSMTPServer  # noqa: E402
+
+SENDER = 'bench@eventease.test'
+
+
+def make_message(i):
+    msg = MIMEText(f'Dear guest {i},\n\nYou are invited.\n' + 'x' * 2000)
+    msg['From'] = SENDER
+    msg['To'] = f'guest{i}@example.test'
+    msg['Subject'] = 'Invitation: Benchmark'
+    return msg.as_string()
+
+
+def bench_legacy(port, count):
+    started = time.perf_counter()
+    for i in range(count):
+        server = smtplib.SMTP('127.0.0.1', port)
+        server.ehlo()
+        server.login('bench', 'secret')
+        server.sendmail(SENDER, f'guest{i}@example.test', make_message(i))
+        server.quit()
+    return time.perf_counter() - started
+
+
+def bench_pooled(port, count, connections):
+    pool = SMTPConnectionPool('127.0.0.1', port, username='bench', password='secret',
+                              use_tls=False, size=connections)
+    engine = DeliveryEngine(pool, SENDER, workers=connections)
+    messages = [OutgoingMessage(i, f'guest{i}@example.test', lambda i=i: make_message(i)) for i in range(count)]
+    started = time.perf_counter()
+    results = engine.send_many(messages)
+    elapsed = time.perf_counter() - started
+    engine.shutdown()
+    failed = sum(1 for r in results if not r.ok)
+    if failed:
+        print(f'  warning: {failed} messages failed')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='simulated per-command server latency in seconds')
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    server = StubSMTPServer(latency=args.latency).start()
+    try:
+        print(f'{args.messages} messages, {args.latency * 1000:.1f} ms simulated latency per command')
+        print(f'{"mode":<22}{"seconds":>10}{"msg/s":>12}{"sessions":>10}')
+
+        before = server.connections
+        elapsed = bench_legacy(server.port, args.messages)
+        print(f'{"legacy (conn/msg)":<22}{elapsed:>10.2f}{args.messages / elapsed:>12.0f}{server.connections - before:>10}')
+
+        for connections in args.connections:
+            before = server.connections
+            elapsed = bench_pooled(server.port, args.messages, connections)
+            label = f'pooled x{connections}'
+            print(f'{label:<22}{elapsed:>10.2f}{args.messages / elapsed:>12.0f}{server.connections - before:>10}')
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Event table size and listing latency, copied provider details vs snapshots.
+
+Seeds a SQLite database (or the database named by --url) with providers and
+events whose vendor and venue details are copied into every event row, as
+create_event does with EVENT_PROVIDER_STORAGE=inline. Measures the event
+table's size and the my_events / vendor_bookings / venue_bookings listing
+queries, runs ``migrate.py --normalize-providers`` and measures again.
+
+    python benchmarks/bench_snapshots.py --events 1000000
+    python benchmarks/bench_snapshots.py --url mysql+pymysql://... --buffer-pool
+
+On MySQL, --buffer-pool also reports how many InnoDB buffer pool pages the
+event table occupies after the listing queries ran (reading
+INNODB_BUFFER_PAGE is slow on large pools). The defaults are smaller so the
+benchmark finishes in a couple of minutes.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+# app.py needs these to import; the benchmark uses its own engine
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate  # noqa: E402
+from app import Event, User  # noqa: E402
+
+LISTING_COLUMNS = {
+    'my_events': (Event.user_email, [Event.title, Event.vendor_email, Event.vendor_services,
+                                     Event.venue_owner_email, Event.venue_owner_name, Event.venue_phone,
+                                     Event.venue_location_lat, Event.venue_location_lng]),
+    'vendor_bookings': (Event.vendor_email, [Event.title, Event.user_name, Event.vendor_services,
+                                             Event.venue_location_lat, Event.venue_location_lng]),
+    'venue_bookings': (Event.venue_owner_email, [Event.title, Event.user_name, Event.vendor_services,
+                                                 Event.venue_location_lat, Event.venue_location_lng]),
+}
+
+
+def seed(engine, users, providers, events, batch=20000):
+    rng = random.Random(42)
+    vendors = [{'name': f'Vendor {i}', 'email': f'vendor{i}@bench.test', 'password': 'x', 'role': 'Vendor',
+                'phone': f'555-{i:04d}', 'services': 'Catering, Decoration, Photography'}
+               for i in range(providers)]
+    venues = [{'name': f'Venue {i}', 'email': f'venue{i}@bench.test', 'password': 'x', 'role': 'Venue Owner',
+               'phone': f'555-{i:04d}', 'venue_lat': rng.uniform(8, 35), 'venue_lng': rng.uniform(68, 97),
+               'venue_address': f'{i} Main Road, Bengaluru, Karnataka'}
+              for i in range(providers)]
+    people = [{'name': f'User {i}', 'email': f'user{i}@bench.test', 'password': 'x', 'role': 'User'}
+              for i in range(users)]
+    start = datetime(2030, 1, 1)
+    ev = Event.__table__
+    with engine.begin() as conn:
+        for rows in (vendors, venues, people):
+            conn.execute(sa.insert(User.__table__), [{'services': None, 'venue_lat': None, 'venue_lng': None,
+                                                      'venue_address': None, 'phone': None, **row}
+                                                     for row in rows])
+    for offset in range(0, events, batch):
+        rows = []
+        for i in range(offset, min(offset + batch, events)):
+            vendor, venue, user = rng.choice(vendors), rng.choice(venues), rng.choice(people)
+            rows.append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))), 'title': f'Event {i}',
+                'description': 'Description', 'event_type': 'Wedding', 'user_email': user['email'],
+                'user_name': user['name'], 'vendor_email': vendor['email'], 'vendor_name': vendor['name'],
+                'vendor_services': vendor['services'], 'vendor_phone': vendor['phone'],
+                'venue_owner_email': venue['email'], 'venue_owner_name': venue['name'],
+                'venue_location_lat': str(venue['venue_lat']), 'venue_location_lng': str(venue['venue_lng']),
+                'venue_address': venue['venue_address'], 'venue_phone': venue['phone'],
+                'reminder_date': start + timedelta(minutes=i),
+            })
+        with engine.begin() as conn:
+            conn.execute(sa.insert(ev), rows)
+    return {'my_events': [p['email'] for p in people], 'vendor_bookings': [v['email'] for v in vendors],
+            'venue_bookings': [v['email'] for v in venues]}
+
+
+def table_bytes(engine, table):
+    """(data bytes, index bytes) of a table"""
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            sizes = conn.execute(sa.text(
+                'SELECT SUM(CASE WHEN m.type = \'table\' THEN s.pgsize END), '
+                'SUM(CASE WHEN m.type = \'index\' THEN s.pgsize END) '
+                'FROM dbstat s JOIN sqlite_master m ON m.name = s.name WHERE m.tbl_name = :t'
+            ), {'t': table}).one()
+        else:
+            conn.execute(sa.text(f'ANALYZE TABLE `{table}`'))
+            sizes = conn.execute(sa.text(
+                'SELECT data_length, index_length FROM information_schema.TABLES '
+                'WHERE table_schema = DATABASE() AND table_name = :t'
+            ), {'t': table}).one()
+    return sizes[0] or 0, sizes[1] or 0
+
+
+def buffer_pool_pages(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(sa.text(
+            'SELECT COUNT(*) FROM information_schema.INNODB_BUFFER_PAGE '
+            'WHERE table_name = CONCAT(\'`\', DATABASE(), \'`.`\', :t, \'`\')'
+        ), {'t': table}).scalar()
+
+
+def time_listings(engine, owners, repeats):
+    rng = random.Random(7)
+    results = {}
+    preview = sa.func.substr(Event.description, 1, 300).label('description')
+    with engine.connect() as conn:
+        for label, (owner, columns) in LISTING_COLUMNS.items():
+            samples = []
+            for _ in range(repeats):
+                query = sa.select(Event.id, Event.reminder_date, preview, *columns).where(
+                    owner == rng.choice(owners[label])).order_by(Event.reminder_date, Event.id).limit(20)
+                started = time.perf_counter()
+                conn.execute(query).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(samples)
+    return results
+
+
+def measure(engine, owners, args):
+    data, index = table_bytes(engine, 'event')
+    snapshots, _ = table_bytes(engine, 'provider_snapshot')
+    results = {'event data MB': data / 2 ** 20, 'event index MB': index / 2 ** 20,
+               'event bytes/row': data / max(args.events, 1), 'snapshot data MB': snapshots / 2 ** 20}
+    results.update({f'{label} p50 ms': ms for label, ms in time_listings(engine, owners, args.repeats).items()})
+    if args.buffer_pool and engine.dialect.name == 'mysql':
+        results['event buffer pool pages'] = buffer_pool_pages(engine, 'event')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--providers', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--buffer-pool', action='store_true', help='report InnoDB buffer pool pages (MySQL)')
+    args = parser.parse_args()
+
+    url = args.url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_snapshots.db")}'
+    engine = sa.create_engine(url)
+    migrate.run(engine, verbose=False)
+
+    started = time.perf_counter()
+    owners = seed(engine, args.users, args.providers, args.events)
+    print(f'Seeded {args.events} events in {time.perf_counter() - started:.0f}s')
+    before = measure(engine, owners, args)
+
+    started = time.perf_counter()
+    migrate.normalize_providers(engine, chunk_size=5000, verbose=False)
+    # Reclaim the space the emptied columns held
+    with engine.connect() as conn:
+        conn.execute(sa.text('VACUUM' if engine.dialect.name == 'sqlite' else 'OPTIMIZE TABLE event'))
+    print(f'Normalized provider details in {time.perf_counter() - started:.1f}s')
+    with engine.connect() as conn:
+        count = conn.execute(sa.text('SELECT COUNT(*) FROM provider_snapshot')).scalar()
+    print(f'{count} provider snapshots')
+    after = measure(engine, owners, args)
+
+    print(f'{"":<28}{"inline":>12}{"snapshot":>12}{"change":>10}')
+    for label in before:
+        change = (after[label] - before[label]) / before[label] * 100 if before[label] else 0
+        print(f'{label:<28}{before[label]:>12.3f}{after[label]:>12.3f}{change:>+9.0f}%')
+
+
+if __name__ == '__main__':
+    main()
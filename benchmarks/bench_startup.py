@@ -0,0 +1,126 @@
+"""Cold start to first served request.
+
+Starts the app in a fresh interpreter and times each phase: importing app.py,
+warm_up() (pooled connections, provider directory, templates) and the first
+/readyz and /login requests.
+
+    python benchmarks/bench_startup.py --runs 5 --target-ms 2000
+    python benchmarks/bench_startup.py --server --workers 4
+
+--server starts gunicorn with gunicorn.conf.py instead and times from launch
+until /readyz answers 200 and the first /login page arrives. The exit status
+is 1 if the median time to the first page is over --target-ms.
+
+DATABASE_URL selects the database (default: a temporary SQLite file, migrated
+before timing starts).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints its phase timings as JSON
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+module.warm_up()
+warmed = time.perf_counter()
+client = module.app.test_client()
+assert client.get('/readyz').status_code == 200
+ready = time.perf_counter()
+assert client.get('/login').status_code == 200
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'warm_up': warmed - imported,
+                  'ready': ready - warmed, 'first_page': served - ready, 'total': served - started}))
+'''
+
+PHASES = ('import', 'warm_up', 'ready', 'first_page', 'total')
+
+
+def in_process(env):
+    # Startup prints (e.g. the warm-up line) come first; the timings are last
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.01)
+    raise TimeoutError(f'{url} did not answer in time')
+
+
+def with_server(env, workers, timeout):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), 'wsgi:application'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for(base + '/readyz', started + timeout)
+        ready = time.perf_counter()
+        wait_for(base + '/login', started + timeout)
+        served = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+    return {'ready': ready - started, 'first_page': served - ready, 'total': served - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=2000, help='median cold start limit')
+    parser.add_argument('--server', action='store_true', help='time a gunicorn server instead')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers with --server')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for a server')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db'))
+    env.setdefault('SESSION_BACKEND', 'memory')
+    env.setdefault('SECRET_KEY', 'benchmark')
+    subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    runs = [with_server(env, args.workers, args.timeout) if args.server else in_process(env)
+            for _ in range(args.runs)]
+    phases = [phase for phase in PHASES if phase in runs[0]]
+    print(f'{"phase":<12}{"median ms":>12}{"max ms":>10}')
+    for phase in phases:
+        values = [run[phase] * 1000 for run in runs]
+        print(f'{phase:<12}{statistics.median(values):>12.1f}{max(values):>10.1f}')
+
+    total = statistics.median(run['total'] * 1000 for run in runs)
+    if total > args.target_ms:
+        print(f'Cold start {total:.0f} ms is over the {args.target_ms:.0f} ms target')
+        sys.exit(1)
+    print(f'Cold start {total:.0f} ms (target {args.target_ms:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Concurrent load test of the read-heavy views.
+
+Seeds the database named by DATABASE_URL (default: a temporary SQLite file),
+serves the app from a threaded WSGI server in this process (or targets
+--base-url, e.g. a gunicorn deployment sharing the same DATABASE_URL), logs
+in one session per virtual client and reports p50/p95/p99 latency per route.
+
+    python benchmarks/load_test.py --clients 200 --duration 30
+    DATABASE_URL=mysql+pymysql://user:pw@localhost/event_ease_bench \\
+        DB_POOL_SIZE=20 DB_MAX_OVERFLOW=40 python benchmarks/load_test.py
+"""
+import argparse
+import http.cookiejar
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load_test.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import app, db, User, Event  # noqa: E402
+
+PASSWORD = 'load-test'
+# (path template, weight); {role_path} is the client's booking dashboard
+ROUTES = [
+    ('/home', 1),
+    ('/select_providers', 3),
+    ('/{role_path}', 4),
+]
+
+
+def seed(users, providers, events_per_user):
+    password = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+    with app.app_context():
+        db.create_all()
+        if User.query.filter_by(email='client0@load.test').first():
+            return
+        rng = random.Random(3)
+        people = []
+        for i in range(providers):
+            people.append(User(name=f'Vendor {i}', email=f'vendor{i}@load.test', password=password, role='Vendor',
+                               services='Catering, Decoration', phone='555-0100'))
+            people.append(User(name=f'Venue {i}', email=f'venue{i}@load.test', password=password, role='Venue Owner',
+                               venue_lat=rng.uniform(8, 35), venue_lng=rng.uniform(68, 97), venue_address='Main Road'))
+        for i in range(users):
+            people.append(User(name=f'Client {i}', email=f'client{i}@load.test', password=password, role='User'))
+        db.session.add_all(people)
+        db.session.commit()
+        start = datetime(2030, 1, 1)
+        rows = []
+        for i in range(users):
+            for j in range(events_per_user):
+                vendor, venue = rng.randrange(providers), rng.randrange(providers)
+                rows.append({
+                    'id': f'{i:06d}-{j:04d}', 'title': f'Event {j}', 'description': 'Load test event. ' * 20,
+                    'event_type': 'Wedding', 'user_email': f'client{i}@load.test', 'user_name': f'Client {i}',
+                    'vendor_email': f'vendor{vendor}@load.test', 'vendor_name': f'Vendor {vendor}',
+                    'vendor_services': 'Catering', 'venue_owner_email': f'venue{venue}@load.test',
+                    'venue_owner_name': f'Venue {venue}', 'reminder_date': start + timedelta(hours=i * 7 + j),
+                })
+        db.session.execute(db.insert(Event.__table__), rows)
+        db.session.commit()
+
+
+class Client:
+    def __init__(self, base_url, email, role_path):
+        self.base_url = base_url
+        self.email = email
+        self.role_path = role_path
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        with self.opener.open(self.base_url + path, data=body, timeout=60) as response:
+            response.read()
+            return response.status
+
+    def login(self):
+        self.request('/login', {'email': self.email, 'password': PASSWORD})
+        # select_providers needs an event type in the session
+        self.request('/select_providers', {'event_type': 'Wedding'})
+
+
+def run_client(client, deadline, results, errors, rng):
+    paths = [path.format(role_path=client.role_path) for path, _ in ROUTES]
+    weights = [weight for _, weight in ROUTES]
+    while time.monotonic() < deadline:
+        path = rng.choices(paths, weights)[0]
+        started = time.perf_counter()
+        try:
+            client.request(path)
+            results[path.split('?')[0]].append(time.perf_counter() - started)
+        except (urllib.error.URLError, OSError) as e:
+            errors[type(e).__name__] += 1
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--providers', type=int, default=200)
+    parser.add_argument('--events-per-user', type=int, default=40)
+    parser.add_argument('--base-url', help='target an already running server instead of an in-process one')
+    args = parser.parse_args()
+
+    seed(args.users, args.providers, args.events_per_user)
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        server.request_queue_size = args.clients
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+    rng = random.Random(9)
+    clients = []
+    for i in range(args.clients):
+        if i % 5 == 4:
+            clients.append(Client(base_url, f'vendor{i % args.providers}@load.test', 'vendor_bookings'))
+        else:
+            clients.append(Client(base_url, f'client{i % args.users}@load.test', 'my_events'))
+    for client in clients:
+        client.login()
+
+    results, errors = defaultdict(list), defaultdict(int)
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=run_client, args=(c, deadline, results, errors, random.Random(rng.random())))
+               for c in clients]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    if server:
+        server.shutdown()
+
+    total = sum(len(samples) for samples in results.values())
+    print(f'{args.clients} clients, {elapsed:.1f}s, {total} requests, {total / elapsed:.0f} req/s, '
+          f'database {os.environ["DATABASE_URL"].split("://")[0]}')
+    print(f'{"route":<22}{"requests":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"mean ms":>10}')
+    for path, samples in sorted(results.items()):
+        print(f'{path:<22}{len(samples):>10}{percentile(samples, 50) * 1000:>10.1f}'
+              f'{percentile(samples, 95) * 1000:>10.1f}{percentile(samples, 99) * 1000:>10.1f}'
+              f'{statistics.mean(samples) * 1000:>10.1f}')
+    if errors:
+        print('errors:', dict(errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Minimal threaded SMTP sink used by the benchmarks.
+
+Speaks just enough ESMTP (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+for ``smtplib`` to deliver messages. Messages are counted, not stored. An
+optional per-command delay simulates the round-trip time of a real relay.
+"""
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply('220 stub ESMTP ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if server.latency:
+                time.sleep(server.latency)
+            command = line[:4].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.wfile.write(b'250-stub\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+            elif command == b'AUTH':
+                self._reply('235 2.7.0 Authentication successful')
+            elif command in (b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self._reply('250 OK')
+            elif command == b'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b'.\r\n':
+                        break
+                    size += len(chunk)
+                with server.lock:
+                    server.messages += 1
+                    server.bytes_received += size
+                self._reply('250 OK queued')
+            elif command == b'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _SMTPHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.connections = 0
+        self.bytes_received = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a stub SMTP sink.')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds slept per SMTP command')
+    args = parser.parse_args()
+    server = StubSMTPServer(port=args.port, latency=args.latency)
+    print(f'Stub SMTP server listening on 127.0.0.1:{server.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,99 @@
+"""Set-based deletes of invitations and whole events.
+
+Nothing here loads ORM objects, so a large cleanup never fills a session's
+identity map. An event's invitations, jobs and reminders are deleted before
+the event itself. Invitations go in chunks of ``chunk_size`` rows, each in
+its own short transaction, so a big guest list never keeps many invitation
+rows locked at once. The ON DELETE CASCADE foreign keys (migration 0010)
+catch anything added in between.
+"""
+import time
+
+from sqlalchemy import delete, select, update
+
+
+def delete_invitations(conn, invitation_table, event_table, event_id, invitation_ids, chunk_size=500):
+    """Delete some of one event's invitations and move its counters to match.
+
+    Runs in the caller's transaction (``conn`` may be a Connection or a
+    Session); returns how many were deleted.
+    """
+    inv, ev = invitation_table, event_table
+    ids = list(invitation_ids)
+    deleted = sent = accepted = declined = 0
+    for start in range(0, len(ids), chunk_size):
+        rows = conn.execute(
+            select(inv.c.id, inv.c.invitation_sent, inv.c.rsvp_status)
+            .where(inv.c.event_id == event_id, inv.c.id.in_(ids[start:start + chunk_size]))
+            .with_for_update()
+        ).all()
+        if not rows:
+            continue
+        conn.execute(delete(inv).where(inv.c.id.in_([row.id for row in rows])))
+        deleted += len(rows)
+        sent += sum(1 for row in rows if row.invitation_sent)
+        accepted += sum(1 for row in rows if row.rsvp_status == 'accepted')
+        declined += sum(1 for row in rows if row.rsvp_status == 'declined')
+    if deleted:
+        conn.execute(update(ev).where(ev.c.id == event_id).values(
+            invitation_total_count=ev.c.invitation_total_count - deleted,
+            invitation_sent_count=ev.c.invitation_sent_count - sent,
+            rsvp_accepted_count=ev.c.rsvp_accepted_count - accepted,
+            rsvp_declined_count=ev.c.rsvp_declined_count - declined,
+        ))
+    return deleted
+
+
+def delete_events(engine, tables, event_ids, chunk_size=1000):
+    """Delete events with their invitations and other rows.
+
+    ``tables`` is (event, invitation, *others): every other table has an
+    ``event_id`` column and few rows per event, so each is cleared in one
+    statement. Returns (events deleted, invitations deleted).
+    """
+    ev, inv, *others = tables
+    ids = list(event_ids)
+    if not ids:
+        return 0, 0
+    invitations = 0
+    while True:
+        with engine.begin() as conn:
+            chunk = conn.execute(
+                select(inv.c.id).where(inv.c.event_id.in_(ids)).limit(chunk_size)
+            ).scalars().all()
+            if chunk:
+                conn.execute(delete(inv).where(inv.c.id.in_(chunk)))
+        invitations += len(chunk)
+        if len(chunk) < chunk_size:
+            break
+    with engine.begin() as conn:
+        for table in others:
+            conn.execute(delete(table).where(table.c.event_id.in_(ids)))
+        events = conn.execute(delete(ev).where(ev.c.id.in_(ids))).rowcount
+    return events, invitations
+
+
+def purge_events(engine, tables, before, events_per_chunk=200, chunk_size=1000, pause=0.0, on_chunk=None):
+    """Delete every event that started before ``before``, a chunk of events at a time.
+
+    ``pause`` seconds are slept between chunks to leave room for other
+    writers. ``on_chunk`` receives each chunk's event ids after it is
+    deleted. Returns (events deleted, invitations deleted).
+    """
+    ev = tables[0]
+    events = invitations = 0
+    while True:
+        with engine.connect() as conn:
+            ids = conn.execute(
+                select(ev.c.id).where(ev.c.reminder_date < before)
+                .order_by(ev.c.reminder_date).limit(events_per_chunk)
+            ).scalars().all()
+        if not ids:
+            return events, invitations
+        deleted_events, deleted_invitations = delete_events(engine, tables, ids, chunk_size)
+        events += deleted_events
+        invitations += deleted_invitations
+        if on_chunk is not None:
+            on_chunk(ids)
+        if pause:
+            time.sleep(pause)
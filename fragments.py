@@ -0,0 +1,87 @@
+"""Cache for rendered template fragments.
+
+Listing pages render the same event and provider cards over and over. A
+template wraps a card in a call block keyed by what it shows and a version
+of that data:
+
+    {% call fragment('my_events/card', event.id, event.updated_at, loop.index) %}
+        ...
+    {% endcall %}
+
+and the block's HTML is reused until the key changes. Fragments live in a
+per-process LRU and, if a ``backend`` is given, in a store shared by every
+process (``RedisFragmentBackend``). Keys include a version of the templates
+themselves, so a deploy that changes a template never serves old HTML.
+"""
+import hashlib
+import os
+
+from markupsafe import Markup
+
+from cache import TTLCache
+
+
+def templates_version(folder):
+    """A digest of every template file's contents under ``folder``"""
+    digest = hashlib.sha1()
+    for root, dirs, files in sorted(os.walk(folder)):
+        dirs.sort()
+        for name in sorted(files):
+            digest.update(name.encode('utf-8'))
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class RedisFragmentBackend:
+    """Fragments shared through Redis (needs the ``redis`` package)"""
+
+    def __init__(self, url, prefix='event_ease:fragment:'):
+        import redis  # Optional dependency, only needed for a shared cache
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, html, ttl):
+        self._redis.set(self.prefix + key, html.encode('utf-8'), ex=ttl)
+
+
+class FragmentCache:
+    def __init__(self, version, max_size=10000, ttl=3600, backend=None):
+        self.version = version
+        self.ttl = ttl
+        self.backend = backend
+        self._local = TTLCache(max_size, ttl)
+
+    def key(self, name, parts):
+        return f'{self.version}:{name}:' + hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def __call__(self, name, *parts, caller):
+        """Jinja call-block entry point: cached HTML, else ``caller()`` rendered once"""
+        key = self.key(name, parts)
+        html = self._local.get(key)
+        if html is None and self.backend is not None:
+            html = self._shared(self.backend.get, key)
+            if html is not None:
+                self._local.set(key, html)
+        if html is None:
+            html = str(caller())
+            self._local.set(key, html)
+            if self.backend is not None:
+                self._shared(self.backend.set, key, html, self.ttl)
+        return Markup(html)
+
+    @staticmethod
+    def _shared(method, *args):
+        # An unreachable shared store only costs renders, never the page
+        try:
+            return method(*args)
+        except Exception:
+            return None
+
+    def clear(self):
+        """Forget this process's fragments (the shared backend expires by TTL)"""
+        self._local.clear()
@@ -0,0 +1,173 @@
+"""Streaming bulk import of guest lists (CSV or vCard).
+
+Uploaded files are read row by row and inserted in chunks: each chunk is
+deduplicated against existing invitations with a single ``IN`` query and
+written with one multi-row INSERT and one commit, so memory use is bounded by
+the chunk size rather than the file size.
+"""
+import csv
+import io
+import re
+from dataclasses import dataclass
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+NAME_HEADERS = ('name', 'guest_name', 'full name', 'fullname')
+EMAIL_HEADERS = ('email', 'guest_email', 'e-mail', 'email address')
+MAX_NAME_LENGTH = 100
+MAX_EMAIL_LENGTH = 100
+
+
+@dataclass
+class ImportSummary:
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+
+    def as_dict(self):
+        return {'imported': self.imported, 'duplicates': self.duplicates, 'invalid': self.invalid}
+
+
+def _guest(name, email):
+    """Normalise a parsed row; returns None if it can't become an invitation"""
+    name = (name or '').strip()
+    email = (email or '').strip()
+    if not EMAIL_RE.match(email) or len(email) > MAX_EMAIL_LENGTH:
+        return None
+    return (name or email.split('@')[0])[:MAX_NAME_LENGTH], email
+
+
+def iter_csv_guests(text_stream):
+    """Yield (name, email) tuples, or None for invalid rows, from a CSV file.
+
+    A header row naming the name/email columns is optional; without one the
+    first two columns are taken as name and email.
+    """
+    reader = csv.reader(text_stream)
+    name_col, email_col = 0, 1
+    for line_number, row in enumerate(reader):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_number == 0:
+            header = [cell.strip().lower() for cell in row]
+            if any(h in EMAIL_HEADERS for h in header):
+                email_col = next(i for i, h in enumerate(header) if h in EMAIL_HEADERS)
+                name_col = next((i for i, h in enumerate(header) if h in NAME_HEADERS), None)
+                continue
+        if len(row) == 1:
+            yield _guest('', row[0])
+            continue
+        name = row[name_col] if name_col is not None and name_col < len(row) else ''
+        yield _guest(name, row[email_col] if email_col < len(row) else '')
+
+
+def _vcard_lines(text_stream):
+    """Unfold vCard continuation lines (RFC 6350 section 3.2)"""
+    pending = None
+    for raw in text_stream:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+def iter_vcard_guests(text_stream):
+    """Yield (name, email) tuples, or None for invalid cards, from a vCard file"""
+    name = email = None
+    in_card = False
+    for line in _vcard_lines(text_stream):
+        key, _, value = line.partition(':')
+        prop = key.split(';', 1)[0].upper()
+        if prop == 'BEGIN' and value.upper() == 'VCARD':
+            in_card, name, email = True, None, None
+        elif prop == 'END' and value.upper() == 'VCARD' and in_card:
+            in_card = False
+            yield _guest(name, email)
+        elif in_card and prop == 'FN':
+            name = value.replace('\\,', ',').replace('\\;', ';')
+        elif in_card and prop == 'EMAIL' and email is None:
+            # Keep the first address; cards often list work and home emails
+            email = value
+
+
+def detect_format(filename, mimetype=None):
+    lowered = (filename or '').lower()
+    if lowered.endswith(('.vcf', '.vcard')) or (mimetype or '').startswith(('text/vcard', 'text/x-vcard')):
+        return 'vcard'
+    return 'csv'
+
+
+def iter_guests(binary_stream, file_format):
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+    if file_format == 'vcard':
+        return iter_vcard_guests(text_stream)
+    return iter_csv_guests(text_stream)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_guests(session, invitation_model, event_id, guests, chunk_size=1000, before_chunk=None, on_insert=None):
+    """Insert parsed guests for an event, one transaction per chunk.
+
+    ``before_chunk()`` runs first in each chunk's transaction (to lock the
+    event, say); ``on_insert(count)`` runs inside it, before commit.
+    """
+    summary = ImportSummary()
+    for chunk in _chunks(guests, chunk_size):
+        valid = [guest for guest in chunk if guest is not None]
+        summary.invalid += len(chunk) - len(valid)
+
+        # Duplicates within the chunk (emails compare case-insensitively, as
+        # the MySQL collation on guest_email does)
+        unique = {}
+        for name, email in valid:
+            unique.setdefault(email.lower(), (name, email))
+        summary.duplicates += len(valid) - len(unique)
+
+        for attempt in range(2):
+            if before_chunk:
+                before_chunk()
+            existing = set()
+            if unique:
+                existing = {
+                    email.lower() for email in session.execute(
+                        select(invitation_model.guest_email).where(
+                            invitation_model.event_id == event_id,
+                            invitation_model.guest_email.in_([email for _, email in unique.values()])
+                        )
+                    ).scalars()
+                }
+            rows = [
+                {'event_id': event_id, 'guest_name': name, 'guest_email': email}
+                for key, (name, email) in unique.items() if key not in existing
+            ]
+            try:
+                if rows:
+                    session.execute(insert(invitation_model.__table__), rows)
+                    if on_insert:
+                        on_insert(len(rows))
+                session.commit()
+                break
+            except IntegrityError:
+                # A guest was added concurrently; re-check this chunk once
+                session.rollback()
+                if attempt:
+                    raise
+        summary.duplicates += len(unique) - len(rows)
+        summary.imported += len(rows)
+    return summary
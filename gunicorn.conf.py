@@ -0,0 +1,29 @@
+"""Gunicorn settings for wsgi:application (see wsgi.py).
+
+    WEB_BIND           address to listen on (default 0.0.0.0:8000)
+    WEB_CONCURRENCY    worker processes (default: one per CPU)
+    WEB_THREADS        request threads per worker (default 8)
+    WEB_TIMEOUT        seconds before a stuck worker is restarted (default 30)
+
+Each worker keeps up to DB_POOL_SIZE + DB_MAX_OVERFLOW database connections
+(see config.py); size them so workers times that stays under the server's
+connection limit.
+"""
+import os
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(os.cpu_count() or 1)))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '8'))
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+keepalive = 5
+
+# Import the app once in the master: workers fork with the code already
+# loaded, so each starts in milliseconds instead of re-importing everything
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Database connections and caches belong to one process each
+    from app import after_fork
+    after_fork()
@@ -0,0 +1,224 @@
+"""In-memory rendering of invitation emails and their ICS attachments.
+
+Everything that is the same for every guest of an event (headers, the body
+text, the VEVENT skeleton and most of the base64-encoded attachment) is
+rendered once into an ``InvitationTemplate``; rendering a guest's message only
+splices in their greeting, ``To`` header and ``ATTENDEE`` line.
+"""
+import base64
+import quopri
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from email.header import Header
+
+# base64 emits 76-character lines, each encoding 57 input bytes
+_B64_LINE_BYTES = 57
+
+
+def _qp(text):
+    return quopri.encodestring(text.encode('utf-8')).decode('ascii')
+
+
+def _one_line(value):
+    # A line break would end the header and let the value add headers of its own
+    if '\r' in value or '\n' in value:
+        raise ValueError(f'Line break in header value {value!r}')
+    return value
+
+
+def _header(value):
+    if _one_line(value).isascii():
+        return value
+    return Header(value, 'utf-8').encode()
+
+
+def _boundary(*parts):
+    """A random MIME boundary that occurs in none of the encoded parts"""
+    while True:
+        boundary = '===============' + secrets.token_hex(10) + '=='
+        if not any(boundary in part for part in parts):
+            return boundary
+
+
+def _display_datetime(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    return value
+
+
+def _parse_event_datetime(reminder_date):
+    if isinstance(reminder_date, datetime):
+        return reminder_date
+    return datetime.strptime(reminder_date, '%Y-%m-%dT%H:%M')
+
+
+class InvitationTemplate:
+    """Event-invariant parts of an invitation email, rendered once per event.
+
+    With ``reminder`` the same message announces an upcoming event instead.
+    """
+
+    def __init__(self, event, from_addr, reminder=False):
+        venue = event.venue_address if event.venue_address else 'TBD'
+
+        # Events without an end time are assumed to last 2 hours
+        event_datetime = _parse_event_datetime(event.reminder_date)
+        end_datetime = getattr(event, 'ends_at', None) or event_datetime + timedelta(hours=2)
+        start_date = event_datetime.strftime('%Y%m%dT%H%M%S')
+        end_date = end_datetime.strftime('%Y%m%dT%H%M%S')
+
+        self.ics_head = f"""BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Event Ease//Event Invitation//EN
+BEGIN:VEVENT
+UID:{event.id}@eventeasy.com
+DTSTART:{start_date}
+DTEND:{end_date}
+SUMMARY:{event.title}
+DESCRIPTION:{event.description}
+LOCATION:{venue}
+ORGANIZER:CN={event.user_name}:MAILTO:{event.user_email}
+"""
+        self.ics_tail = """STATUS:CONFIRMED
+SEQUENCE:0
+END:VEVENT
+END:VCALENDAR"""
+
+        # Pre-encode the whole 57-byte lines of the ICS head; only the rest
+        # (head remainder + ATTENDEE + tail) is encoded per guest
+        head_bytes = self.ics_head.encode('utf-8')
+        split = len(head_bytes) - len(head_bytes) % _B64_LINE_BYTES
+        self._ics_head_b64 = base64.encodebytes(head_bytes[:split]).decode('ascii')
+        self._ics_head_rest = head_bytes[split:]
+        self._ics_tail_bytes = self.ics_tail.encode('utf-8')
+
+        heading = f"Reminder: {event.title} is coming up" if reminder else f"You're invited to: {event.title}"
+        body_rest = f"""
+{heading}
+
+Event Details:
+- Type: {event.event_type}
+- Date & Time: {_display_datetime(event.reminder_date)}
+- Venue: {venue}
+- Organized by: {event.user_name}
+
+Description:
+{event.description}
+
+Vendor: {event.vendor_name}
+Services: {event.vendor_services}
+"""
+        body_closing = """
+Please find the calendar invitation attached to add this event to your calendar.
+
+Best regards,
+Event Ease Team
+"""
+        filename = event.title.replace(' ', '_')
+        if '"' in filename or '\\' in filename:
+            raise ValueError(f'Quote or backslash in attachment filename {filename!r}')
+        subject = 'Reminder' if reminder else 'Invitation'
+        # Quoted-printable is line-local, so the shared lines encode once
+        self._body_rest_qp = _qp(body_rest)
+        self._body_closing_qp = _qp(body_closing)
+        # Random rather than derived from the event, and checked against the
+        # encoded text, so no description can close a part early
+        boundary = _boundary(self._body_rest_qp, self._body_closing_qp, self._ics_head_b64)
+        self._headers_head = (
+            f'Content-Type: multipart/mixed; boundary="{boundary}"\n'
+            'MIME-Version: 1.0\n'
+            f'From: {from_addr}\n'
+            'To: '
+        )
+        self._headers_tail = (
+            f'\nSubject: {_header(f"{subject}: {event.title}")}\n'
+            '\n'
+            f'--{boundary}\n'
+            'Content-Type: text/plain; charset="utf-8"\n'
+            'MIME-Version: 1.0\n'
+            'Content-Transfer-Encoding: quoted-printable\n'
+            '\n'
+        )
+        self._attachment_head = (
+            f'\n--{boundary}\n'
+            'Content-Type: application/octet-stream\n'
+            'MIME-Version: 1.0\n'
+            'Content-Transfer-Encoding: base64\n'
+            f'Content-Disposition: attachment; filename="{_header(filename)}.ics"\n'
+            '\n'
+        )
+        self._closing = f'--{boundary}--\n'
+
+    @staticmethod
+    def guest_lines(guest_name, guest_email, rsvp_url=None):
+        """The guest's ICS lines: ATTENDEE, plus a URL to their RSVP page"""
+        lines = f'ATTENDEE:CN={guest_name}:MAILTO:{guest_email}\n'
+        return lines + f'URL:{rsvp_url}\n' if rsvp_url else lines
+
+    @staticmethod
+    def rsvp_text(rsvp_url):
+        if not rsvp_url:
+            return ''
+        return f"""
+Will you attend? Let the organizer know:
+- Accept: {rsvp_url}/accept
+- Decline: {rsvp_url}/decline
+"""
+
+    def render_ics(self, guest_name, guest_email, rsvp_url=None):
+        """Return the guest's ICS calendar file as text"""
+        return self.ics_head + self.guest_lines(guest_name, guest_email, rsvp_url) + self.ics_tail
+
+    def render(self, guest_name, guest_email, rsvp_url=None):
+        """Return the complete MIME message for one guest as a string.
+
+        ``rsvp_url`` is the guest's RSVP page; the body links to its
+        ``/accept`` and ``/decline`` variants. Raises ValueError if
+        ``guest_email`` can't go into a ``To`` header as it is.
+        """
+        guest_email = _one_line(guest_email)
+        guest_lines = self.guest_lines(guest_name, guest_email, rsvp_url).encode('utf-8')
+        ics_rest = self._ics_head_rest + guest_lines + self._ics_tail_bytes
+        return ''.join((
+            self._headers_head,
+            guest_email,
+            self._headers_tail,
+            _qp(f'Dear {guest_name},\n'),
+            self._body_rest_qp,
+            _qp(self.rsvp_text(rsvp_url)),
+            self._body_closing_qp,
+            self._attachment_head,
+            self._ics_head_b64,
+            base64.encodebytes(ics_rest).decode('ascii'),
+            self._closing,
+        ))
+
+
+class TemplateCache:
+    """Small thread-safe LRU of InvitationTemplates keyed by event content"""
+
+    FIELDS = ('id', 'title', 'description', 'event_type', 'reminder_date', 'venue_address',
+              'user_name', 'user_email', 'vendor_name', 'vendor_services')
+
+    def __init__(self, from_addr, max_size=256):
+        self.from_addr = from_addr
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, event, reminder=False):
+        # Keyed on the rendered fields so an edited event never reuses stale text
+        key = tuple(getattr(event, field) for field in self.FIELDS) + (getattr(event, 'ends_at', None), reminder)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+        template = InvitationTemplate(event, self.from_addr, reminder)
+        with self._lock:
+            self._templates[key] = template
+            if len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
@@ -0,0 +1,80 @@
+"""Leases on rows claimed by background processes (worker.py, reminders.py).
+
+A claimable row has ``lease_owner`` and ``lease_expires_at`` columns. It is
+claimed with a conditional UPDATE, so however many processes run at once only
+one wins it, and a row left behind by a crashed process can be claimed again
+once its lease expires. The owner renews the lease as it makes progress and
+gives it up when it is done or fails.
+"""
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(session, model, available, order_by, lease_seconds, values=None):
+    """Lease the first available row of ``model`` to this process, or return None.
+
+    ``available`` are the filters a row must match besides having no live
+    lease; ``values`` are set on the row along with the lease.
+    """
+    now = datetime.utcnow()
+    unleased = or_(model.lease_expires_at == None, model.lease_expires_at < now)
+    candidates = session.query(model.id).filter(*available, unleased).order_by(order_by).limit(10).all()
+
+    for (row_id,) in candidates:
+        # Conditional update: only one process can win the lease
+        claimed = session.query(model).filter(model.id == row_id, *available, unleased).update({
+            **(values or {}),
+            'lease_owner': WORKER_ID,
+            'lease_expires_at': now + timedelta(seconds=lease_seconds)
+        }, synchronize_session=False)
+        session.commit()
+        if claimed:
+            return session.get(model, row_id)
+    return None
+
+
+def held(row):
+    """Whether this process still owns the row's lease.
+
+    A process that stalled past the expiry may have lost it; the new owner
+    continues from the last committed progress.
+    """
+    return row.lease_owner == WORKER_ID
+
+
+def renew(row, lease_seconds):
+    """Extend the lease; committed with the caller's progress"""
+    row.lease_expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds)
+
+
+def end(row):
+    """Drop the lease of a finished row; committed by the caller"""
+    row.lease_owner = None
+    row.lease_expires_at = None
+
+
+def run(session, model, row, process, description, retry_values):
+    """Call ``process(row)`` on a claimed row, then close the session.
+
+    If it raises, the error is logged and the lease is given up, with
+    ``retry_values`` set on the row, so it is picked up again; progress
+    committed so far is kept.
+    """
+    row_id = row.id
+    try:
+        process(row)
+    except Exception:
+        print(f"Error {description}:")
+        traceback.print_exc()
+        session.rollback()
+        session.query(model).filter_by(id=row_id, lease_owner=WORKER_ID).update(
+            {'lease_owner': None, **retry_values}, synchronize_session=False)
+        session.commit()
+    finally:
+        session.remove()
@@ -0,0 +1,78 @@
+"""Keyset (cursor) pagination for the event listing pages.
+
+Listings are ordered newest first by ``(reminder_date, id)``, which matches
+the composite ``(owner column, reminder_date, id)`` indexes on ``event``, so
+every page is a short index range scan no matter how deep into the history
+it is. Events without a date sort last.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(reminder_date, row_id):
+    raw = f'{reminder_date.isoformat() if reminder_date else ""}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (reminder_date, id) from a cursor, or None if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_part, row_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(date_part) if date_part else None), row_id
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def parse_date_range(args):
+    """Read the inclusive ``from``/``to`` (YYYY-MM-DD) filters from query args"""
+    def parse(name):
+        try:
+            return datetime.strptime(args.get(name, ''), '%Y-%m-%d')
+        except ValueError:
+            return None
+    start, end = parse('from'), parse('to')
+    return start, (end + timedelta(days=1) if end else None)
+
+
+def page_size(args):
+    try:
+        return max(1, min(int(args.get('per_page', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+
+def keyset_page(query, date_column, id_column, args):
+    """Apply the date filter, cursor and ordering; return (rows, next_cursor)"""
+    start, end = parse_date_range(args)
+    if start:
+        query = query.filter(date_column >= start)
+    if end:
+        query = query.filter(date_column < end)
+
+    position = decode_cursor(args.get('cursor'))
+    if position:
+        last_date, last_id = position
+        if last_date is None:
+            query = query.filter(date_column.is_(None), id_column < last_id)
+        else:
+            query = query.filter(or_(
+                date_column < last_date,
+                and_(date_column == last_date, id_column < last_id),
+                date_column.is_(None)
+            ))
+
+    size = page_size(args)
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].reminder_date, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,208 @@
+"""Pooled, concurrent SMTP delivery for Event Ease.
+
+A bounded pool of persistent, authenticated SMTP sessions is shared by a
+worker pool so bulk sends (invitations, reminders) don't pay a TCP connect,
+STARTTLS and login round-trip per message.
+"""
+import queue
+import smtplib
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+def is_connection_error(exc):
+    """True if ``exc`` means the session is gone and a fresh one should be tried.
+
+    ``SMTPException`` subclasses ``OSError``, so protocol-level rejections
+    (bad recipient, message refused) have to be told apart from socket errors.
+    """
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+@dataclass
+class OutgoingMessage:
+    """A message queued for delivery.
+
+    ``build`` is called on the worker thread and must return the full message
+    as a string, so rendering is parallelised along with the network I/O.
+    """
+    key: object
+    recipient: str
+    build: object
+
+
+@dataclass
+class DeliveryResult:
+    key: object
+    recipient: str
+    ok: bool
+    error: str = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Bounded pool of reusable, logged-in SMTP sessions."""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 size=4, timeout=30, max_messages_per_connection=500, idle_check_after=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_check_after = idle_check_after
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._quietly_close(smtp)
+            raise
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _quietly_close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn):
+        if time.monotonic() - conn.last_used < self.idle_check_after:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError('SMTP pool is closed')
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_alive(conn):
+                    return conn
+                self._quietly_close(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or self._closed or conn.sent >= self.max_messages_per_connection:
+                self._quietly_close(conn.smtp)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = is_connection_error(e)
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def sendmail(self, from_addr, to_addrs, message, retries=2):
+        """Send one message, reconnecting if the pooled session has dropped.
+
+        Returns the number of attempts used; raises the last error if every
+        attempt failed.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self.connection() as conn:
+                    conn.smtp.sendmail(from_addr, to_addrs, message)
+                    conn.sent += 1
+                return attempt
+            except Exception as e:
+                if not is_connection_error(e) or attempt > retries:
+                    raise
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quietly_close(conn.smtp)
+
+
+class DeliveryEngine:
+    """Fans messages out over a worker pool sharing one SMTP connection pool."""
+
+    def __init__(self, pool, from_addr, workers=None, retries=2):
+        self.pool = pool
+        self.from_addr = from_addr
+        self.workers = workers or pool.size
+        self.retries = retries
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='smtp-delivery')
+
+    def _deliver(self, message):
+        started = time.perf_counter()
+        result = DeliveryResult(key=message.key, recipient=message.recipient, ok=False)
+        try:
+            body = message.build()
+            result.attempts = self.pool.sendmail(self.from_addr, [message.recipient], body, retries=self.retries)
+            result.ok = True
+        except Exception as e:
+            print(f"Error sending email to {message.recipient}:")
+            traceback.print_exc()
+            result.error = f'{type(e).__name__}: {e}'
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def send(self, message):
+        """Deliver a single message on the calling thread."""
+        return self._deliver(message)
+
+    def send_many(self, messages):
+        """Deliver messages concurrently; results are returned in input order."""
+        return list(self._executor.map(self._deliver, messages))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
@@ -0,0 +1,249 @@
+"""Opt-in request instrumentation with a Prometheus-style ``/metrics`` view.
+
+For every request it records the wall time and splits it into SQL (statement
+count and time, from SQLAlchemy cursor events), template rendering (Flask's
+template signals) and session load/save. Email is sent by worker.py and
+reminders.py, outside any request; they log each batch's SMTP time. Totals are exported per endpoint; requests slower than
+``slow_request_seconds`` are logged to ``event_ease.slow`` with the breakdown
+and their slowest statements.
+
+Counters live in the process, so under a multi-process server each worker
+exposes its own series; scrape every worker or aggregate them downstream.
+"""
+import bisect
+import contextvars
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SECTIONS = ('sql', 'template', 'session')
+
+slow_log = logging.getLogger('event_ease.slow')
+
+_current = contextvars.ContextVar('event_ease_request_timings', default=None)
+
+
+class RequestTimings:
+    """Time spent by one request, filled in by the hooks below"""
+    __slots__ = ('started', 'status', 'sql_count', 'seconds', 'statements', 'max_statements', 'template_stack')
+
+    def __init__(self, max_statements):
+        self.started = time.perf_counter()
+        self.status = 500
+        self.sql_count = 0
+        self.seconds = dict.fromkeys(SECTIONS, 0.0)
+        self.statements = []  # min-heap of (seconds, statement), the slowest ones
+        self.max_statements = max_statements
+        self.template_stack = []
+
+    def add_statement(self, seconds, statement):
+        self.sql_count += 1
+        self.seconds['sql'] += seconds
+        if len(self.statements) < self.max_statements:
+            heapq.heappush(self.statements, (seconds, statement))
+        elif self.statements and seconds > self.statements[0][0]:
+            heapq.heapreplace(self.statements, (seconds, statement))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metrics:
+    """Thread-safe counters and histograms, rendered in Prometheus text format"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}  # (endpoint, method, status) -> [bucket counts..., sum, count]
+        self._sections = {}  # endpoint -> {'sql_statements': n, 'sql': s, 'template': s, ...}
+
+    def observe_request(self, endpoint, method, status, timings, elapsed):
+        key = (endpoint, method, str(status))
+        with self._lock:
+            series = self._requests.get(key)
+            if series is None:
+                series = self._requests[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, elapsed)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += elapsed
+            series[-1] += 1
+            totals = self._sections.get(endpoint)
+            if totals is None:
+                totals = self._sections[endpoint] = dict.fromkeys(('sql_statements',) + SECTIONS, 0)
+            totals['sql_statements'] += timings.sql_count
+            for section, seconds in timings.seconds.items():
+                totals[section] += seconds
+
+    def render(self):
+        with self._lock:
+            requests = {key: list(series) for key, series in self._requests.items()}
+            sections = {endpoint: dict(totals) for endpoint, totals in self._sections.items()}
+
+        lines = [
+            '# HELP event_ease_request_duration_seconds Wall time of HTTP requests.',
+            '# TYPE event_ease_request_duration_seconds histogram',
+        ]
+        names = ('endpoint', 'method', 'status')
+        for key, series in sorted(requests.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'event_ease_request_duration_seconds_bucket{_labels(names, key, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'event_ease_request_duration_seconds_bucket{_labels(names, key, le)} {series[-1]}')
+            lines.append(f'event_ease_request_duration_seconds_sum{_labels(names, key)} {series[-2]:.6f}')
+            lines.append(f'event_ease_request_duration_seconds_count{_labels(names, key)} {series[-1]}')
+
+        lines += [
+            '# HELP event_ease_request_sql_statements_total SQL statements executed by requests.',
+            '# TYPE event_ease_request_sql_statements_total counter',
+        ]
+        for endpoint, totals in sorted(sections.items()):
+            lines.append(f'event_ease_request_sql_statements_total{_labels(("endpoint",), (endpoint,))} '
+                         f'{totals["sql_statements"]}')
+        for section, description in (('sql', 'executing SQL'), ('template', 'rendering templates'),
+                                     ('session', 'loading and saving the session')):
+            metric = f'event_ease_request_{section}_seconds_total'
+            lines += [f'# HELP {metric} Request time spent {description}.', f'# TYPE {metric} counter']
+            for endpoint, totals in sorted(sections.items()):
+                lines.append(f'{metric}{_labels(("endpoint",), (endpoint,))} {totals[section]:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+class _TimedSessionInterface:
+    """Wraps the app's session interface to time session load and save"""
+
+    def __init__(self, inner, instrumentation):
+        self._inner = inner
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def open_session(self, app, request):
+        # The session is opened first thing in a request, so timing starts here
+        self._instrumentation._start_request()
+        with self._instrumentation.timed('session'):
+            return self._inner.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with self._instrumentation.timed('session'):
+            return self._inner.save_session(app, session, response)
+
+
+class Instrumentation:
+    def __init__(self, slow_request_seconds=1.0, max_statements=10):
+        self.enabled = False
+        self.slow_request_seconds = slow_request_seconds
+        self.max_statements = max_statements
+        self.metrics = Metrics()
+
+    def init_app(self, app, endpoint='/metrics'):
+        """Install the hooks and the metrics view.
+
+        Call after the app's session interface is configured; it gets wrapped.
+        """
+        self.enabled = True
+        app.session_interface = _TimedSessionInterface(app.session_interface, self)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.add_url_rule(endpoint, 'metrics', self.metrics_view)
+
+    def metrics_view(self):
+        return self.metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    @contextmanager
+    def timed(self, section):
+        """Add the time spent in the block to the current request's ``section``"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timings = _current.get()
+            if timings is not None:
+                timings.seconds[section] += elapsed
+
+    def _start_request(self):
+        if _current.get() is None:
+            _current.set(RequestTimings(self.max_statements))
+
+    def _record_status(self, response):
+        timings = _current.get()
+        if timings is not None:
+            timings.status = response.status_code
+        return response
+
+    def _finish_request(self, exc=None):
+        timings = _current.get()
+        if timings is None:
+            return
+        _current.set(None)
+        elapsed = time.perf_counter() - timings.started
+        endpoint = request.endpoint or 'unmatched'
+        self.metrics.observe_request(endpoint, request.method, timings.status, timings, elapsed)
+        if elapsed >= self.slow_request_seconds:
+            self._log_slow_request(endpoint, timings, elapsed)
+
+    def _log_slow_request(self, endpoint, timings, elapsed):
+        seconds = timings.seconds
+        other = elapsed - sum(seconds.values())
+        lines = [
+            f'Slow request {request.method} {request.full_path.rstrip("?")} ({endpoint}) -> {timings.status} '
+            f'in {elapsed * 1000:.1f} ms: sql {timings.sql_count} statements {seconds["sql"] * 1000:.1f} ms, '
+            f'templates {seconds["template"] * 1000:.1f} ms, session {seconds["session"] * 1000:.1f} ms, '
+            f'other {other * 1000:.1f} ms'
+        ]
+        for statement_seconds, statement in sorted(timings.statements, reverse=True):
+            lines.append(f'  {statement_seconds * 1000:8.1f} ms  {" ".join(statement.split())[:500]}')
+        slow_log.warning('\n'.join(lines))
+
+    def _template_started(self, sender, template, context, **extra):
+        timings = _current.get()
+        if timings is not None:
+            timings.template_stack.append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        timings = _current.get()
+        if timings is not None and timings.template_stack:
+            started = timings.template_stack.pop()
+            if not timings.template_stack:
+                timings.seconds['template'] += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('event_ease_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = conn.info.get('event_ease_query_started')
+    if timings is not None and started:
+        timings.add_statement(time.perf_counter() - started.pop(), statement)
@@ -0,0 +1,365 @@
+"""Schema migrations for existing Event Ease databases.
+
+``db.create_all()`` only creates missing tables; it never adds columns or
+indexes to tables that already exist. Run this after deploying a release that
+changes the models:
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+    python migrate.py --normalize-providers   # move event provider details into snapshots
+
+Like the app, it needs SECRET_KEY and DATABASE_URL; for the development
+server's default database, run it with DEV_DEFAULTS=1:
+
+    DEV_DEFAULTS=1 python migrate.py
+
+Every migration is idempotent (it checks the live schema before changing it),
+so a fresh database built by ``create_all`` simply records them as applied.
+"""
+import argparse
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import (app, db, Event, EventReminder, Invitation, ProviderSnapshot, User, PROVIDER_ROLES,
+                 event_time_now, reminder_due_at)
+from provider_snapshots import SnapshotStore, event_values
+
+MIGRATIONS = []
+
+schema_migrations = sa.Table(
+    'schema_migrations', sa.MetaData(),
+    sa.Column('name', sa.String(100), primary_key=True),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+
+def migration(name):
+    """Register a migration; they run in registration order"""
+    def register(fn):
+        MIGRATIONS.append((name, fn))
+        return fn
+    return register
+
+
+def has_column(conn, table, column):
+    return any(c['name'] == column for c in sa.inspect(conn).get_columns(table))
+
+
+def has_index(conn, table, index):
+    return any(i['name'] == index for i in sa.inspect(conn).get_indexes(table))
+
+
+def add_column(conn, model, name):
+    """Add a model column to its existing table, with its scalar default"""
+    table = model.__table__
+    column = table.c[name]
+    if has_column(conn, table.name, name):
+        return
+    preparer = conn.dialect.identifier_preparer
+    ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} ' \
+          f'{column.type.compile(dialect=conn.dialect)}'
+    if column.default is not None and column.default.is_scalar:
+        literal = sa.literal(column.default.arg, column.type)
+        ddl += ' DEFAULT ' + str(literal.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    conn.execute(sa.text(ddl))
+
+
+def create_index(conn, table, name, columns, unique=False):
+    """Create an index if it doesn't exist yet.
+
+    Indexes are spelled out here rather than taken from the models, so old
+    migrations keep working after the models change.
+    """
+    if has_index(conn, table, name):
+        return
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(sa.text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX {preparer.quote(name)} ON {preparer.quote(table)} '
+        f'({", ".join(preparer.quote(c) for c in columns)})'
+    ))
+
+
+def drop_index(conn, table, name):
+    if not has_index(conn, table, name):
+        return
+    preparer = conn.dialect.identifier_preparer
+    if conn.dialect.name == 'mysql':
+        conn.execute(sa.text(f'DROP INDEX {preparer.quote(name)} ON {preparer.quote(table)}'))
+    else:
+        conn.execute(sa.text(f'DROP INDEX {preparer.quote(name)}'))
+
+
+@migration('0001_invitation_delivery_columns')
+def invitation_delivery_columns(conn):
+    add_column(conn, Invitation, 'send_attempts')
+    add_column(conn, Invitation, 'next_attempt_at')
+    add_column(conn, Invitation, 'last_error')
+
+
+@migration('0002_lookup_indexes')
+def lookup_indexes(conn):
+    create_index(conn, 'user', 'ix_user_role', ['role'])
+    create_index(conn, 'event', 'ix_event_user_email', ['user_email'])
+    create_index(conn, 'event', 'ix_event_vendor_email', ['vendor_email'])
+    create_index(conn, 'event', 'ix_event_venue_owner_email', ['venue_owner_email'])
+    if not has_index(conn, 'invitation', 'uq_invitation_event_guest'):
+        # Drop duplicates left by the old check-then-insert race, keeping the
+        # first row. The derived table keeps MySQL from rejecting the subquery.
+        conn.execute(sa.text(
+            'DELETE FROM invitation WHERE id NOT IN ('
+            'SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM invitation '
+            'GROUP BY event_id, guest_email) AS keepers)'
+        ))
+        create_index(conn, 'invitation', 'uq_invitation_event_guest', ['event_id', 'guest_email'], unique=True)
+    create_index(conn, 'invitation', 'ix_invitation_event_sent', ['event_id', 'invitation_sent'])
+
+
+@migration('0003_event_reminder_datetime')
+def event_reminder_datetime(conn):
+    """Store reminder_date as DATETIME and index listings by (owner, date, id)"""
+    column = next(c for c in sa.inspect(conn).get_columns('event') if c['name'] == 'reminder_date')
+    if conn.dialect.name == 'mysql':
+        if not isinstance(column['type'], sa.DateTime):
+            # Values came from <input type="datetime-local">: YYYY-MM-DDTHH:MM.
+            # Anything unparseable becomes NULL.
+            conn.execute(sa.text('ALTER TABLE event ADD COLUMN reminder_at DATETIME NULL'))
+            conn.execute(sa.text("UPDATE event SET reminder_at = STR_TO_DATE(reminder_date, '%Y-%m-%dT%H:%i')"))
+            conn.execute(sa.text('ALTER TABLE event DROP COLUMN reminder_date'))
+            conn.execute(sa.text('ALTER TABLE event CHANGE reminder_at reminder_date DATETIME NULL'))
+    else:
+        # SQLite keeps the declared type; rewrite values into the format the
+        # DateTime type reads and sorts correctly
+        conn.execute(sa.text(
+            "UPDATE event SET reminder_date = CASE "
+            "WHEN reminder_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]' "
+            "THEN replace(reminder_date, 'T', ' ') || '\\:00.000000' ELSE NULL END "
+            "WHERE reminder_date NOT GLOB "
+            "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]*'"
+        ))
+    # The composite indexes cover the single-column ones (and the user_email
+    # foreign key), so those are dropped once their replacements exist
+    create_index(conn, 'event', 'ix_event_user_date', ['user_email', 'reminder_date', 'id'])
+    create_index(conn, 'event', 'ix_event_vendor_date', ['vendor_email', 'reminder_date', 'id'])
+    create_index(conn, 'event', 'ix_event_venue_owner_date', ['venue_owner_email', 'reminder_date', 'id'])
+    drop_index(conn, 'event', 'ix_event_user_email')
+    drop_index(conn, 'event', 'ix_event_vendor_email')
+    drop_index(conn, 'event', 'ix_event_venue_owner_email')
+
+
+@migration('0004_numeric_venue_coordinates')
+def numeric_venue_coordinates(conn):
+    """Store User.venue_lat/venue_lng as DOUBLE instead of strings"""
+    for name in ('venue_lat', 'venue_lng'):
+        column = next(c for c in sa.inspect(conn).get_columns('user') if c['name'] == name)
+        if isinstance(column['type'], sa.Float):
+            continue
+        # Copy through a new column; blank or non-numeric values become NULL
+        preparer = conn.dialect.identifier_preparer
+        user, old, new = preparer.quote('user'), preparer.quote(name), preparer.quote(f'{name}_num')
+        conn.execute(sa.text(f'ALTER TABLE {user} ADD COLUMN {new} {sa.Double().compile(dialect=conn.dialect)}'))
+        if conn.dialect.name == 'mysql':
+            numeric = f"{old} REGEXP '^ *-?[0-9]+(\\\\.[0-9]+)? *$'"
+        else:
+            numeric = f"trim({old}) <> '' AND trim({old}) NOT GLOB '*[^0-9.-]*'"
+        conn.execute(sa.text(f'UPDATE {user} SET {new} = CAST({old} AS DECIMAL(10, 7)) WHERE {numeric}'))
+        conn.execute(sa.text(f'ALTER TABLE {user} DROP COLUMN {old}'))
+        conn.execute(sa.text(f'ALTER TABLE {user} RENAME COLUMN {new} TO {old}'))
+
+
+@migration('0005_event_rsvp_counters')
+def event_rsvp_counters(conn):
+    """Per-event accepted/declined counters, backfilled from the invitations"""
+    if has_column(conn, 'event', 'rsvp_accepted_count'):
+        return
+    add_column(conn, Event, 'rsvp_accepted_count')
+    add_column(conn, Event, 'rsvp_declined_count')
+    conn.execute(sa.text(
+        "UPDATE event SET "
+        "rsvp_accepted_count = (SELECT COUNT(*) FROM invitation "
+        "WHERE invitation.event_id = event.id AND invitation.rsvp_status = 'accepted'), "
+        "rsvp_declined_count = (SELECT COUNT(*) FROM invitation "
+        "WHERE invitation.event_id = event.id AND invitation.rsvp_status = 'declined')"
+    ))
+
+
+@migration('0006_event_invitation_counters')
+def event_invitation_counters(conn):
+    """Per-event total/sent invitation counters, backfilled from the invitations"""
+    if has_column(conn, 'event', 'invitation_total_count'):
+        return
+    add_column(conn, Event, 'invitation_total_count')
+    add_column(conn, Event, 'invitation_sent_count')
+    conn.execute(sa.text(
+        "UPDATE event SET "
+        "invitation_total_count = (SELECT COUNT(*) FROM invitation WHERE invitation.event_id = event.id), "
+        "invitation_sent_count = (SELECT COUNT(*) FROM invitation "
+        "WHERE invitation.event_id = event.id AND invitation.invitation_sent = 1)"
+    ))
+
+
+@migration('0007_event_provider_snapshots')
+def event_provider_snapshots(conn):
+    """References from events to provider_snapshot (the table itself comes from create_all)"""
+    add_column(conn, Event, 'vendor_snapshot_id')
+    add_column(conn, Event, 'venue_snapshot_id')
+
+
+@migration('0008_event_updated_at')
+def event_updated_at(conn):
+    """Version column for cached listing fragments and ETags.
+
+    Existing events stay NULL, which is a valid version of their own; filling
+    it in would rewrite every event row for nothing.
+    """
+    add_column(conn, Event, 'updated_at')
+
+
+@migration('0009_event_end_times')
+def event_end_times(conn):
+    """Event end times for availability checks, and an index over start times.
+
+    Existing events get the 2 hours their calendar invitations always assumed.
+    """
+    if not has_column(conn, 'event', 'ends_at'):
+        add_column(conn, Event, 'ends_at')
+        if conn.dialect.name == 'mysql':
+            conn.execute(sa.text('UPDATE event SET ends_at = DATE_ADD(reminder_date, INTERVAL 2 HOUR) '
+                                 'WHERE reminder_date IS NOT NULL'))
+        else:
+            # Same text format the SQLite DateTime type writes
+            conn.execute(sa.text("UPDATE event SET ends_at = datetime(reminder_date, '+2 hours') || '.000000' "
+                                 "WHERE reminder_date IS NOT NULL"))
+    create_index(conn, 'event', 'ix_event_reminder_date', ['reminder_date'])
+
+
+@migration('0010_cascade_event_deletes')
+def cascade_event_deletes(conn):
+    """Drop invitations and jobs left behind by deleted events, then make the
+    foreign keys to event cascade.
+
+    SQLite can't alter a foreign key in place; there the orphans are removed
+    and bulk_delete keeps deleting children explicitly, as it does anyway.
+    """
+    preparer = conn.dialect.identifier_preparer
+    for table in ('invitation', 'invitation_job'):
+        quoted = preparer.quote(table)
+        conn.execute(sa.text(f'DELETE FROM {quoted} WHERE NOT EXISTS '
+                             f'(SELECT 1 FROM event WHERE event.id = {quoted}.event_id)'))
+        if conn.dialect.name != 'mysql':
+            continue
+        for fk in sa.inspect(conn).get_foreign_keys(table):
+            if fk['referred_table'] != 'event' or fk['options'].get('ondelete', '').upper() == 'CASCADE':
+                continue
+            conn.execute(sa.text(f'ALTER TABLE {quoted} DROP FOREIGN KEY {preparer.quote(fk["name"])}'))
+            conn.execute(sa.text(f'ALTER TABLE {quoted} ADD CONSTRAINT {preparer.quote(fk["name"])} '
+                                 'FOREIGN KEY (event_id) REFERENCES event (id) ON DELETE CASCADE'))
+
+
+@migration('0011_event_reminders')
+def event_reminders(conn):
+    """Schedule reminders for events that haven't started yet (the table comes from create_all)"""
+    ev, reminder = Event.__table__, EventReminder.__table__
+    rows = conn.execute(
+        sa.select(ev.c.id, ev.c.reminder_date)
+        .where(ev.c.reminder_date > event_time_now(),
+               ~sa.exists().where(reminder.c.event_id == ev.c.id))
+    ).all()
+    params = [{'event_id': row.id, 'due_at': reminder_due_at(row.reminder_date)} for row in rows]
+    if params:
+        conn.execute(sa.insert(reminder).values(status='pending', organizer_sent=False, last_invitation_id=0,
+                                                sent_count=0, failed_count=0), params)
+
+
+# Copied provider columns on event, by database name
+INLINE_PROVIDER_COLUMNS = ('vendor_name', 'vendor_services', 'vendor_phone', 'venue_owner_name',
+                           'venue_location_lat', 'venue_location_lng', 'venue_address', 'venue_phone')
+
+
+def normalize_providers(engine, chunk_size=1000, verbose=True):
+    """Replace events' copied provider details with references to snapshots.
+
+    Each event's own copy becomes its snapshot, so events keep showing the
+    details they were booked with. Runs in ``chunk_size`` event transactions
+    and can be interrupted and re-run. Returns the number of events moved.
+    """
+    ev = Event.__table__
+    store = SnapshotStore(lambda: engine, ProviderSnapshot.__table__)
+    with engine.connect() as conn:
+        provider_ids = dict(conn.execute(
+            sa.select(User.email, User.id).where(User.role.in_(PROVIDER_ROLES))).all())
+
+    update = sa.update(ev).where(ev.c.id == sa.bindparam('event_id')).values(
+        vendor_snapshot_id=sa.bindparam('vendor_id'), venue_snapshot_id=sa.bindparam('venue_id'),
+        **{name: None for name in INLINE_PROVIDER_COLUMNS})
+    has_copy = sa.or_(ev.c.vendor_name.isnot(None), ev.c.venue_owner_name.isnot(None))
+    last_id, moved = '', 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                sa.select(ev.c.id, ev.c.vendor_email, ev.c.venue_owner_email, ev.c.vendor_snapshot_id,
+                          ev.c.venue_snapshot_id, *(ev.c[name] for name in INLINE_PROVIDER_COLUMNS))
+                .where(ev.c.id > last_id, has_copy).order_by(ev.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return moved
+            params = []
+            for row in rows:
+                vendor, venue = event_values(row, provider_ids)
+                params.append({
+                    'event_id': row.id,
+                    'vendor_id': store.snapshot_id(vendor, conn) if vendor else row.vendor_snapshot_id,
+                    'venue_id': store.snapshot_id(venue, conn) if venue else row.venue_snapshot_id,
+                })
+            conn.execute(update, params)
+        last_id = rows[-1].id
+        moved += len(rows)
+        if verbose:
+            print(f'Normalized {moved} events')
+
+
+def applied_migrations(engine):
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row.name for row in conn.execute(sa.select(schema_migrations.c.name))}
+
+
+def run(engine, verbose=True):
+    """Create missing tables, then apply every pending migration"""
+    db.metadata.create_all(engine)
+    done = applied_migrations(engine)
+    for name, fn in MIGRATIONS:
+        if name in done:
+            continue
+        if verbose:
+            print(f'Applying {name}')
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.utcnow()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply Event Ease schema migrations.')
+    parser.add_argument('--status', action='store_true', help='list migrations without applying them')
+    parser.add_argument('--normalize-providers', action='store_true',
+                        help='after migrating, move copied provider details on events into provider snapshots')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='events per --normalize-providers transaction')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            done = applied_migrations(db.engine)
+            for name, _ in MIGRATIONS:
+                print(f'[{"x" if name in done else " "}] {name}')
+        else:
+            run(db.engine)
+            print('Database schema is up to date.')
+            if args.normalize_providers:
+                moved = normalize_providers(db.engine, args.chunk_size)
+                print(f'Moved the provider details of {moved} events into snapshots.')
+
+
+if __name__ == '__main__':
+    main()
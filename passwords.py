@@ -0,0 +1,56 @@
+"""Password hashing off the request threads, with a configurable cost.
+
+Hashes use Werkzeug's format, so ``method`` is any method string
+``generate_password_hash`` accepts, e.g. ``scrypt:32768:8:1`` (its default)
+or ``pbkdf2:sha256:600000``. A stored hash made with a different method is
+replaced on the next successful login (see ``needs_rehash``).
+
+Hashing runs on a fixed pool of ``workers`` threads; hashlib releases the GIL
+while it hashes, so they use that many cores. At most ``max_pending`` hashes
+may be queued or running: beyond that ``PasswordHasherBusy`` is raised at
+once, so a burst of logins gets turned away instead of tying up every request
+thread while the rest of the site's routes wait.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes are already waiting for the pool"""
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt:32768:8:1', workers=4, max_pending=64, salt_length=16):
+        if method.split(':', 1)[0] not in ('scrypt', 'pbkdf2'):
+            raise ValueError(f'Unsupported password hash method {method!r}')
+        self.method = method
+        self.salt_length = salt_length
+        # Werkzeug fills in defaults ('scrypt' -> 'scrypt:32768:8:1'), so take
+        # the prefix it actually writes rather than the configured string
+        self.prefix = generate_password_hash('', method, salt_length).split('$', 1)[0]
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if a hash was made with a method other than the configured one"""
+        return password_hash.split('$', 1)[0] != self.prefix
@@ -0,0 +1,112 @@
+"""Immutable, deduplicated snapshots of the providers booked for events.
+
+Events used to copy their vendor's and venue owner's name, services, phone,
+location and address into eight string columns of every event row. An event
+can instead point at two rows of ``provider_snapshot``: the provider's
+details as they were when the event was booked. Snapshots are never updated
+(a later profile edit produces a new one, so old events keep their history)
+and identical details share a single row, found through a content hash.
+"""
+import hashlib
+import json
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from cache import TTLCache
+
+SNAPSHOT_FIELDS = ('provider_id', 'role', 'name', 'email', 'phone', 'services',
+                   'venue_lat', 'venue_lng', 'venue_address')
+
+def provider_values(provider):
+    """Snapshot values for a providers.Provider"""
+    return {
+        'provider_id': provider.id,
+        'role': provider.role,
+        'name': provider.name,
+        'email': provider.email,
+        'phone': provider.phone,
+        'services': provider.services if provider.role == 'Vendor' else None,
+        'venue_lat': provider.venue_lat if provider.role == 'Venue Owner' else None,
+        'venue_lng': provider.venue_lng if provider.role == 'Venue Owner' else None,
+        'venue_address': provider.venue_address if provider.role == 'Venue Owner' else None,
+    }
+
+
+def _coordinate(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def event_values(row, provider_ids):
+    """(vendor, venue) snapshot values rebuilt from an event's own copied columns.
+
+    ``provider_ids`` maps provider emails to user ids. Either side is None if
+    the event has no copied details for it.
+    """
+    vendor = venue = None
+    if row.vendor_name is not None:
+        vendor = {
+            'provider_id': provider_ids.get(row.vendor_email), 'role': 'Vendor', 'name': row.vendor_name,
+            'email': row.vendor_email, 'phone': row.vendor_phone, 'services': row.vendor_services,
+            'venue_lat': None, 'venue_lng': None, 'venue_address': None,
+        }
+    if row.venue_owner_name is not None:
+        venue = {
+            'provider_id': provider_ids.get(row.venue_owner_email), 'role': 'Venue Owner',
+            'name': row.venue_owner_name, 'email': row.venue_owner_email, 'phone': row.venue_phone,
+            'services': None, 'venue_lat': _coordinate(row.venue_location_lat),
+            'venue_lng': _coordinate(row.venue_location_lng), 'venue_address': row.venue_address,
+        }
+    return vendor, venue
+
+
+def content_hash(values):
+    return hashlib.sha256(json.dumps([values[f] for f in SNAPSHOT_FIELDS]).encode('utf-8')).hexdigest()
+
+
+class SnapshotStore:
+    """Finds or creates the snapshot for a set of provider details"""
+
+    def __init__(self, engine, table, cache_size=10000, cache_ttl=3600):
+        """``engine`` is a callable returning the SQLAlchemy engine to use"""
+        self.engine = engine
+        self.table = table
+        # Snapshots never change, so a hash -> id entry only goes stale if
+        # the row is purged; the TTL bounds that
+        self._ids = TTLCache(cache_size, cache_ttl)
+
+    def snapshot_id(self, values, conn=None):
+        digest = content_hash(values)
+        snapshot_id = self._ids.get(digest)
+        if snapshot_id is None:
+            snapshot_id = self._find_or_create(digest, values, conn)
+            self._ids.set(digest, snapshot_id)
+        return snapshot_id
+
+    def _find(self, conn, digest):
+        return conn.execute(select(self.table.c.id).where(self.table.c.content_hash == digest)).scalar()
+
+    def _find_or_create(self, digest, values, conn=None):
+        if conn is not None:
+            # Caller's transaction (bulk backfills, which run single-threaded)
+            snapshot_id = self._find(conn, digest)
+            if snapshot_id is None:
+                snapshot_id = conn.execute(
+                    insert(self.table).values(content_hash=digest, **values)).inserted_primary_key[0]
+            return snapshot_id
+
+        # Own short transaction, so the snapshot never depends on the caller's
+        # commit; a concurrent insert of the same content loses the race here
+        with self.engine().begin() as own:
+            snapshot_id = self._find(own, digest)
+            if snapshot_id is not None:
+                return snapshot_id
+        try:
+            with self.engine().begin() as own:
+                return own.execute(insert(self.table).values(content_hash=digest, **values)).inserted_primary_key[0]
+        except IntegrityError:
+            with self.engine().begin() as own:
+                return self._find(own, digest)
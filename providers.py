@@ -0,0 +1,208 @@
+"""In-process directory of vendors and venue owners.
+
+``select_providers`` used to scan the ``user`` table on every request. The
+directory keeps a compact, immutable snapshot of every provider in memory,
+with vendors pre-sorted for paging, a lowercase copy of ``services`` for term
+search, and venues bucketed into a lat/lng grid so nearest-venue queries only
+look at the cells around the search point.
+
+A snapshot is rebuilt lazily after ``invalidate()`` (called when providers
+register or change their profile) or once it is older than ``ttl`` seconds,
+which bounds staleness for changes made through other worker processes.
+"""
+import heapq
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+EARTH_RADIUS_KM = 6371.0
+
+
+@dataclass(frozen=True, slots=True)
+class Provider:
+    """The provider fields the selection pages and create_event need"""
+    id: int
+    name: str
+    email: str
+    role: str
+    phone: str
+    services: str
+    venue_lat: float
+    venue_lng: float
+    venue_address: str
+
+    @property
+    def has_location(self):
+        return self.venue_lat is not None and self.venue_lng is not None
+
+
+@dataclass
+class Page:
+    items: list
+    total: int
+    page: int
+    per_page: int
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def paginate(items, page, per_page):
+    page = max(1, page)
+    start = (page - 1) * per_page
+    return Page(items[start:start + per_page], len(items), page, per_page)
+
+
+class _Snapshot:
+    def __init__(self, providers, cell_deg):
+        self.built_at = time.monotonic()
+        self.cell_deg = cell_deg
+        ordered = sorted(providers, key=lambda p: (p.name.lower(), p.id))
+        self.by_email = {p.email: p for p in ordered}
+        self.vendors = [p for p in ordered if p.role == 'Vendor']
+        self.vendor_services = [(p.services or '').lower() for p in self.vendors]
+        self.venues = [p for p in ordered if p.role == 'Venue Owner']
+        self.grid = {}
+        for venue in self.venues:
+            if venue.has_location:
+                self.grid.setdefault(self.cell(venue.venue_lat, venue.venue_lng), []).append(venue)
+
+    def cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+
+class ProviderDirectory:
+    def __init__(self, loader, ttl=300, cell_deg=0.25):
+        """``loader`` returns an iterable of Provider records from the database"""
+        self.loader = loader
+        self.ttl = ttl
+        self.cell_deg = cell_deg
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.ttl:
+            return snapshot
+        with self._lock:
+            # Another request may have rebuilt it while we waited
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.built_at >= self.ttl:
+                snapshot = _Snapshot(list(self.loader()), self.cell_deg)
+                self._snapshot = snapshot
+        return snapshot
+
+    def get(self, email):
+        return self.snapshot().by_email.get(email) if email else None
+
+    def vendors(self, term=None, page=1, per_page=20, exclude=()):
+        """Vendors ordered by name, optionally filtered by a term in services.
+
+        ``exclude`` is a set of emails to leave out (e.g. booked providers).
+        """
+        snapshot = self.snapshot()
+        if term:
+            term = term.strip().lower()
+            matches = [v for v, services in zip(snapshot.vendors, snapshot.vendor_services) if term in services]
+        else:
+            matches = snapshot.vendors
+        if exclude:
+            matches = [v for v in matches if v.email not in exclude]
+        return paginate(matches, page, per_page)
+
+    def venues(self, page=1, per_page=20, exclude=()):
+        venues = self.snapshot().venues
+        if exclude:
+            venues = [v for v in venues if v.email not in exclude]
+        return paginate(venues, page, per_page)
+
+    def nearest_venues(self, lat, lng, radius_km=25, limit=100, exclude=()):
+        """Venues within ``radius_km`` of a point, nearest first.
+
+        Returns (venue, distance_km) pairs. Only grid cells that can contain a
+        venue inside the radius are visited.
+        """
+        snapshot = self.snapshot()
+        cell_deg = snapshot.cell_deg
+        lat_cells = math.ceil(radius_km / (111.32 * cell_deg))
+        # A degree of longitude shrinks towards the poles
+        lng_scale = max(math.cos(math.radians(min(abs(lat) + radius_km / 111.32, 89.9))), 1e-6)
+        lng_cells = math.ceil(radius_km / (111.32 * lng_scale * cell_deg))
+        centre_i, centre_j = snapshot.cell(lat, lng)
+
+        found = []
+        for i in range(centre_i - lat_cells, centre_i + lat_cells + 1):
+            for j in range(centre_j - lng_cells, centre_j + lng_cells + 1):
+                for venue in snapshot.grid.get((i, j), ()):
+                    if venue.email in exclude:
+                        continue
+                    distance = haversine_km(lat, lng, venue.venue_lat, venue.venue_lng)
+                    if distance <= radius_km:
+                        found.append((distance, venue.id, venue))
+        return [(venue, distance) for distance, _, venue in heapq.nsmallest(limit, found)]
+
+    def venues_in_bbox(self, south, west, north, east):
+        """Venues with a location inside a bounding box.
+
+        ``west`` > ``east`` means the box crosses the antimeridian. Only grid
+        cells overlapping the box are visited, or every occupied cell if that
+        is fewer (a zoomed-out world view) or the box wraps.
+        """
+        snapshot = self.snapshot()
+        wraps = west > east
+
+        def inside(venue):
+            in_lng = (venue.venue_lng >= west or venue.venue_lng <= east) if wraps else west <= venue.venue_lng <= east
+            return in_lng and south <= venue.venue_lat <= north
+
+        (i0, j0), (i1, j1) = snapshot.cell(south, west), snapshot.cell(north, east)
+        if wraps or (i1 - i0 + 1) * (j1 - j0 + 1) > len(snapshot.grid):
+            cells = snapshot.grid.values()
+        else:
+            cells = [snapshot.grid.get((i, j), ()) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+        return [venue for cell in cells for venue in cell if inside(venue)]
+
+
+def cluster(venues, south, west, north, east, max_points=200, grid=8):
+    """Group venues into at most grid x grid clusters if there are more than ``max_points``.
+
+    Returns (venues, clusters); each cluster is (count, mean lat, mean lng).
+    Cells holding a single venue stay venues.
+    """
+    if len(venues) <= max_points:
+        return venues, []
+    lat_step = max(north - south, 1e-9) / grid
+    lng_span = (east - west) % 360 or 360
+    lng_step = lng_span / grid
+    cells = {}
+    for venue in venues:
+        i = min(int((venue.venue_lat - south) / lat_step), grid - 1)
+        j = min(int(((venue.venue_lng - west) % 360) / lng_step), grid - 1)
+        cells.setdefault((i, j), []).append(venue)
+    singles, clusters = [], []
+    for members in cells.values():
+        if len(members) == 1:
+            singles.extend(members)
+        else:
+            clusters.append((len(members), sum(v.venue_lat for v in members) / len(members),
+                             sum(v.venue_lng for v in members) / len(members)))
+    return singles, clusters
@@ -0,0 +1,125 @@
+"""Dispatcher for reminder emails sent before events start.
+
+Run one or more of these next to the web processes:
+
+    python reminders.py
+
+It needs SECRET_KEY and DATABASE_URL, or DEV_DEFAULTS=1 next to the
+development server, like migrate.py.
+
+Every upcoming event has an event_reminder row due REMINDER_LEAD_HOURS before
+it starts. The dispatcher asks the (status, due_at) index for due reminders
+and, when there are none, for the time the next one is due, then sleeps until
+then. Neither query's cost depends on how many events exist.
+
+Reminders are claimed with a lease, like invitation jobs (see leases.py), so
+several dispatchers can run at once and one left behind by a crashed process
+is picked up once its lease expires. The organizer and the accepted guests
+are mailed in batches through the invitation delivery engine. Each batch
+commits its progress, so after a crash at most that batch is sent again.
+Reminders for events that have already started are dropped unsent. Due times
+are UTC; event start times are wall-clock times in APP_TIMEZONE.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import leases
+from app import app, db, Event, EventReminder, Invitation, event_time_now, send_reminder_emails
+from leases import WORKER_ID
+
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '100'))
+REMINDER_LEASE_SECONDS = int(os.getenv('REMINDER_LEASE_SECONDS', '300'))
+# Longest sleep, which bounds how late a reminder created while asleep can be
+REMINDER_MAX_SLEEP = float(os.getenv('REMINDER_MAX_SLEEP', '60'))
+# Sleep while every due reminder is leased by another dispatcher
+REMINDER_BUSY_SLEEP = float(os.getenv('REMINDER_BUSY_SLEEP', '5'))
+
+
+def claim_reminder():
+    """Lease the earliest due reminder, or return None"""
+    return leases.claim(db.session, EventReminder, (
+        EventReminder.status == 'pending',
+        EventReminder.due_at <= datetime.utcnow()
+    ), EventReminder.due_at, REMINDER_LEASE_SECONDS)
+
+
+def next_due_at():
+    """When the earliest pending reminder is due (None if there are none)"""
+    return db.session.query(db.func.min(EventReminder.due_at)).filter(EventReminder.status == 'pending').scalar()
+
+
+def next_batch(event_id, after_id):
+    return Invitation.query.filter(
+        Invitation.event_id == event_id,
+        Invitation.rsvp_status == 'accepted',
+        Invitation.id > after_id
+    ).order_by(Invitation.id).limit(REMINDER_BATCH_SIZE).all()
+
+
+def process_reminder(reminder):
+    while True:
+        if not leases.held(reminder):
+            return
+        # Reloaded every batch, as in worker.process_job
+        event = db.session.get(Event, reminder.event_id)
+        if event is None or event.reminder_date is None or event.reminder_date <= event_time_now():
+            break
+        batch = next_batch(event.id, reminder.last_invitation_id)
+        if not batch and reminder.organizer_sent:
+            break
+
+        started = time.perf_counter()
+        results = send_reminder_emails(event, batch, organizer=not reminder.organizer_sent)
+        sent = sum(1 for result in results if result.ok)
+        print(f"Event {event.id}: sent {sent}/{len(results)} reminders "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        reminder.organizer_sent = True
+        if batch:
+            reminder.last_invitation_id = batch[-1].id
+        reminder.sent_count += sent
+        reminder.failed_count += len(results) - sent
+        leases.renew(reminder, REMINDER_LEASE_SECONDS)
+        db.session.commit()
+
+    reminder.status = 'done'
+    reminder.finished_at = datetime.utcnow()
+    leases.end(reminder)
+    db.session.commit()
+
+
+def run_once():
+    """Claim and send a single reminder; returns True if there was one"""
+    reminder = claim_reminder()
+    if reminder is None:
+        return False
+    # On an error the reminder can be claimed again after a short pause
+    leases.run(db.session, EventReminder, reminder, process_reminder,
+               f'sending reminders for event {reminder.event_id}',
+               {'lease_expires_at': datetime.utcnow() + timedelta(seconds=REMINDER_BUSY_SLEEP)})
+    return True
+
+
+def seconds_until_next():
+    """How long to sleep before a reminder can be due"""
+    due_at = next_due_at()
+    db.session.remove()
+    if due_at is None:
+        return REMINDER_MAX_SLEEP
+    wait = (due_at - datetime.utcnow()).total_seconds()
+    # Overdue but not claimable: another dispatcher holds its lease
+    return REMINDER_BUSY_SLEEP if wait <= 0 else min(wait, REMINDER_MAX_SLEEP)
+
+
+def run_dispatcher():
+    print(f"Reminder dispatcher {WORKER_ID} started")
+    while True:
+        with app.app_context():
+            if run_once():
+                continue
+            wait = seconds_until_next()
+        time.sleep(wait)
+
+
+if __name__ == '__main__':
+    run_dispatcher()
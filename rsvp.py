@@ -0,0 +1,121 @@
+"""Tokenized RSVP links with coalesced, batched status writes.
+
+Every invitation email carries accept/decline links holding a signed token
+for the invitation id, so the RSVP endpoint can validate it without touching
+the database. A link only opens a confirmation page (mail scanners fetch
+every link); the answer is the form POST from that page. Answers are buffered in memory (the last answer per
+invitation wins) and a background thread writes them every ``interval``
+seconds: one transaction per flush updates ``invitation.rsvp_status`` with one
+UPDATE per answer and adjusts the per-event accepted/declined counters.
+
+An answer is acknowledged before it is written, so a crashed process can lose
+up to ``interval`` seconds of answers; the guest can simply answer again.
+"""
+import atexit
+import threading
+import traceback
+from collections import defaultdict
+
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import select, update
+
+RSVP_RESPONSES = {'accept': 'accepted', 'decline': 'declined'}
+COUNTED_STATUSES = ('accepted', 'declined')
+
+
+class RsvpTokens:
+    def __init__(self, secret_key):
+        self._serializer = URLSafeSerializer(secret_key, salt='rsvp')
+
+    def dumps(self, invitation_id):
+        return self._serializer.dumps(invitation_id)
+
+    def loads(self, token):
+        """Return the invitation id in a token, or None if it isn't valid"""
+        try:
+            invitation_id = self._serializer.loads(token)
+        except BadSignature:
+            return None
+        return invitation_id if isinstance(invitation_id, int) else None
+
+
+class RsvpBuffer:
+    """Collects RSVP answers and hands them to ``flush`` in batches"""
+
+    def __init__(self, flush, interval=0.25, max_pending=5000):
+        """``flush`` receives a {invitation_id: status} dict"""
+        self.flush_batch = flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, invitation_id, status):
+        with self._lock:
+            self._pending[invitation_id] = status
+            full = len(self._pending) >= self.max_pending
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rsvp-flusher', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self.flush_batch(batch)
+        except Exception:
+            print('Error writing RSVP batch; it will be retried:')
+            traceback.print_exc()
+            with self._lock:
+                # Newer answers that arrived meanwhile take precedence
+                self._pending = {**batch, **self._pending}
+            return 0
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+def write_rsvp_batch(engine, invitation_table, event_table, batch, chunk_size=500):
+    """Apply {invitation_id: status} in one transaction, keeping event counters in step"""
+    inv, ev = invitation_table, event_table
+    ids = list(batch)
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTED_STATUSES, 0))
+    with engine.begin() as conn:
+        changed = defaultdict(list)
+        for start in range(0, len(ids), chunk_size):
+            rows = conn.execute(
+                select(inv.c.id, inv.c.event_id, inv.c.rsvp_status)
+                .where(inv.c.id.in_(ids[start:start + chunk_size]))
+                .with_for_update()
+            ).all()
+            for row in rows:
+                status = batch[row.id]
+                if row.rsvp_status == status:
+                    continue
+                changed[status].append(row.id)
+                if row.rsvp_status in COUNTED_STATUSES:
+                    deltas[row.event_id][row.rsvp_status] -= 1
+                deltas[row.event_id][status] += 1
+
+        for status, status_ids in changed.items():
+            for start in range(0, len(status_ids), chunk_size):
+                conn.execute(update(inv).where(inv.c.id.in_(status_ids[start:start + chunk_size]))
+                             .values(rsvp_status=status))
+        for event_id, delta in deltas.items():
+            conn.execute(update(ev).where(ev.c.id == event_id).values(
+                rsvp_accepted_count=ev.c.rsvp_accepted_count + delta['accepted'],
+                rsvp_declined_count=ev.c.rsvp_declined_count + delta['declined'],
+            ))
+    return sum(len(status_ids) for status_ids in changed.values())
+
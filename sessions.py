@@ -0,0 +1,200 @@
+"""Server-side sessions behind a small opaque session-id cookie.
+
+Flask's default session serializes, signs and sends the whole session dict
+with every response that changes it. Here the cookie only carries a random
+session id; the data lives in a store:
+
+    MemorySessionStore    per-process LRU, for a single process or development
+    DatabaseSessionStore  a table in the main database, shared by every process
+
+Sessions expire ``ttl`` seconds after they were last used. Unchanged sessions
+are only written back (a cheap expiry bump) once half the TTL has passed, and
+expired rows are deleted in batches every ``cleanup_interval`` seconds.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from sqlalchemy import delete, insert, select, update
+
+from cache import TTLCache
+
+SID_BYTES = 32
+
+
+def new_sid():
+    return secrets.token_urlsafe(SID_BYTES)
+
+
+class ServerSideSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.new = sid is None
+        self.sid = sid or new_sid()
+        self.expires_at = expires_at
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh session id, e.g. after logging in"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = new_sid()
+        self.new = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """Sessions in this process only; lost on restart"""
+
+    def __init__(self, max_size=100000, ttl=86400):
+        # Entries are (expires_at, data); the cache's own TTL matches the session TTL
+        self._cache = TTLCache(max_size, ttl)
+
+    def load(self, sid):
+        """Return (expires_at as a unix time, data) or None"""
+        return self._cache.get(sid)
+
+    def save(self, sid, data, ttl, new):
+        self._cache.set(sid, (time.time() + ttl, data))
+
+    def touch(self, sid, ttl):
+        entry = self._cache.get(sid)
+        if entry is not None:
+            self._cache.set(sid, (time.time() + ttl, entry[1]))
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+    def cleanup(self):
+        return self._cache.expire()
+
+
+class DatabaseSessionStore:
+    """Sessions in a (sid, data, expires_at) table, shared by every process"""
+
+    def __init__(self, engine, table, cleanup_interval=300, cleanup_batch_size=1000):
+        """``engine`` is a callable returning the SQLAlchemy engine to use"""
+        self.engine = engine
+        self.table = table
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch_size = cleanup_batch_size
+        self._next_cleanup = time.monotonic() + cleanup_interval
+        self._cleanup_lock = threading.Lock()
+
+    def load(self, sid):
+        t = self.table
+        with self.engine().connect() as conn:
+            row = conn.execute(
+                select(t.c.data, t.c.expires_at).where(t.c.sid == sid, t.c.expires_at > datetime.utcnow())
+            ).first()
+        if row is None:
+            return None
+        return row.expires_at.replace(tzinfo=None), row.data.decode('utf-8')
+
+    def save(self, sid, data, ttl, new):
+        t = self.table
+        values = {'data': data.encode('utf-8'), 'expires_at': datetime.utcnow() + timedelta(seconds=ttl)}
+        with self.engine().begin() as conn:
+            # Existing sessions are updated; one that expired and was cleaned
+            # up in the meantime is inserted again
+            if new or not conn.execute(update(t).where(t.c.sid == sid).values(**values)).rowcount:
+                conn.execute(insert(t).values(sid=sid, **values))
+        self._maybe_cleanup()
+
+    def touch(self, sid, ttl):
+        t = self.table
+        with self.engine().begin() as conn:
+            conn.execute(update(t).where(t.c.sid == sid).values(
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl)))
+
+    def delete(self, sid):
+        t = self.table
+        with self.engine().begin() as conn:
+            conn.execute(delete(t).where(t.c.sid == sid))
+
+    def cleanup(self):
+        """Delete expired sessions in batches; returns how many were removed"""
+        t = self.table
+        removed = 0
+        while True:
+            with self.engine().begin() as conn:
+                sids = conn.execute(
+                    select(t.c.sid).where(t.c.expires_at <= datetime.utcnow()).limit(self.cleanup_batch_size)
+                ).scalars().all()
+                if sids:
+                    conn.execute(delete(t).where(t.c.sid.in_(sids)))
+            removed += len(sids)
+            if len(sids) < self.cleanup_batch_size:
+                return removed
+
+    def _maybe_cleanup(self):
+        if time.monotonic() < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_cleanup = time.monotonic() + self.cleanup_interval
+            self.cleanup()
+        finally:
+            self._cleanup_lock.release()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, ttl=86400):
+        self.store = store
+        self.ttl = ttl
+
+    def _expires_at(self, value):
+        # The memory store keeps unix times, the database store UTC datetimes
+        if isinstance(value, datetime):
+            return (value - datetime(1970, 1, 1)).total_seconds()
+        return value
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) < 100:
+            entry = self.store.load(sid)
+            if entry is not None:
+                expires_at, data = entry
+                try:
+                    initial = self.serializer.loads(data)
+                except ValueError:
+                    initial = None
+                if initial is not None:
+                    return ServerSideSession(initial, sid=sid, expires_at=self._expires_at(expires_at))
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+            if session.modified or session.previous_sid:
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite,
+                                       httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        if session.modified or session.new:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), self.ttl, session.new)
+        elif session.expires_at is not None and session.expires_at - time.time() < self.ttl / 2:
+            self.store.touch(session.sid, self.ttl)
+
+        if session.new:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+            response.vary.add('Cookie')
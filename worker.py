@@ -0,0 +1,165 @@
+"""Background worker that delivers queued invitation jobs.
+
+Run one or more of these next to the web processes:
+
+    python worker.py
+
+It needs SECRET_KEY and DATABASE_URL, or DEV_DEFAULTS=1 next to the
+development server, like migrate.py.
+
+Jobs are claimed with a lease (see leases.py), so several workers can run at
+once and a job left behind by a crashed worker is picked up again once its
+lease expires.
+Invitations are sent in batches and every batch is committed as soon as it
+finishes; failed sends are retried with exponential backoff.
+
+If EVENT_RETENTION_DAYS is set, each worker also deletes events that started
+longer ago than that, every EVENT_PURGE_INTERVAL seconds (see bulk_delete.py).
+"""
+import os
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from app import (app, db, Event, Invitation, InvitationJob, send_invitation_emails, adjust_invitation_counters,
+                 EVENT_DELETE_TABLES, INVITATION_BATCH_SIZE, MAX_SEND_ATTEMPTS, DELETE_CHUNK_SIZE,
+                 EVENT_RETENTION_DAYS, EVENT_PURGE_INTERVAL, event_time_now)
+from bulk_delete import purge_events
+import leases
+from leases import WORKER_ID
+
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+RETRY_BACKOFF_SECONDS = int(os.getenv('RETRY_BACKOFF_SECONDS', '30'))
+RETRY_BACKOFF_MAX_SECONDS = int(os.getenv('RETRY_BACKOFF_MAX_SECONDS', '3600'))
+POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '2'))
+PURGE_PAUSE = float(os.getenv('EVENT_PURGE_PAUSE', '0.1'))  # Seconds between chunks of purged events
+
+
+def retry_delay(attempts):
+    """Exponential backoff for the given number of failed attempts"""
+    return timedelta(seconds=min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), RETRY_BACKOFF_MAX_SECONDS))
+
+
+def claim_job():
+    """Lease the next runnable job, or return None"""
+    return leases.claim(db.session, InvitationJob, (
+        InvitationJob.status.in_(('queued', 'running')),
+        InvitationJob.run_after <= datetime.utcnow()
+    ), InvitationJob.run_after, JOB_LEASE_SECONDS, {'status': 'running'})
+
+
+def next_batch(event_id):
+    return Invitation.query.filter(
+        Invitation.event_id == event_id,
+        Invitation.invitation_sent == False,
+        Invitation.send_attempts < MAX_SEND_ATTEMPTS,
+        db.or_(Invitation.next_attempt_at == None, Invitation.next_attempt_at <= datetime.utcnow())
+    ).order_by(Invitation.id).limit(INVITATION_BATCH_SIZE).all()
+
+
+def finish_job(job):
+    """Mark the job done, or park it until the earliest pending retry"""
+    # Guests added while the job was running have no next_attempt_at yet
+    next_retry = db.session.query(
+        db.func.min(db.func.coalesce(Invitation.next_attempt_at, datetime.utcnow()))
+    ).filter(
+        Invitation.event_id == job.event_id,
+        Invitation.invitation_sent == False,
+        Invitation.send_attempts < MAX_SEND_ATTEMPTS
+    ).scalar()
+    leases.end(job)
+    if next_retry:
+        job.status = 'queued'
+        job.run_after = next_retry
+    else:
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def process_job(job):
+    while True:
+        if not leases.held(job):
+            return
+        # Reloaded every batch: commits expire it, and messages are rendered
+        # on the delivery threads, which must not lazy-load through this session
+        event = db.session.get(Event, job.event_id)
+        if event is None:
+            break
+        batch = next_batch(event.id)
+        if not batch:
+            break
+
+        started = time.perf_counter()
+        results = send_invitation_emails(event, batch)
+        print(f"Job {job.id}: sent {sum(1 for result in results if result.ok)}/{len(results)} invitations "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        now = datetime.utcnow()
+        sent_ids = []
+        for invitation, result in zip(batch, results):
+            if result.ok:
+                sent_ids.append(invitation.id)
+            else:
+                invitation.send_attempts += 1
+                invitation.next_attempt_at = now + retry_delay(invitation.send_attempts)
+                invitation.last_error = (result.error or '')[:500]
+                if invitation.send_attempts >= MAX_SEND_ATTEMPTS:
+                    job.failed_count += 1
+        # Conditional, so a batch sent twice after a lost lease is counted once
+        sent = Invitation.query.filter(
+            Invitation.id.in_(sent_ids),
+            Invitation.invitation_sent == False
+        ).update({'invitation_sent': True, 'last_error': None}, synchronize_session=False) if sent_ids else 0
+        job.sent_count += sent
+        adjust_invitation_counters(event.id, sent=sent)
+        leases.renew(job, JOB_LEASE_SECONDS)
+        # Commit each batch so progress survives a crash
+        db.session.commit()
+
+    finish_job(job)
+
+
+def run_once():
+    """Claim and process a single job; returns True if there was one"""
+    job = claim_job()
+    if job is None:
+        return False
+    # On an error the job is retried after a short pause
+    leases.run(db.session, InvitationJob, job, process_job, f'processing invitation job {job.id}', {
+        'lease_expires_at': None,
+        'status': 'queued',
+        'run_after': datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS)
+    })
+    return True
+
+
+def purge_old_events():
+    """Delete events past the retention window; returns (events, invitations) deleted"""
+    # Start times are on the event clock (APP_TIMEZONE), not UTC
+    cutoff = event_time_now() - timedelta(days=EVENT_RETENTION_DAYS)
+    try:
+        return purge_events(db.engine, EVENT_DELETE_TABLES, cutoff, chunk_size=DELETE_CHUNK_SIZE, pause=PURGE_PAUSE)
+    except Exception:
+        # Another worker purging the same chunk, say; the next run picks up the rest
+        print("Error purging old events:")
+        traceback.print_exc()
+        return 0, 0
+
+
+def run_worker():
+    print(f"Invitation worker {WORKER_ID} started")
+    next_purge = time.monotonic()
+    while True:
+        with app.app_context():
+            if EVENT_RETENTION_DAYS and time.monotonic() >= next_purge:
+                events, invitations = purge_old_events()
+                if events:
+                    print(f"Purged {events} past events and {invitations} invitations")
+                next_purge = time.monotonic() + EVENT_PURGE_INTERVAL
+            worked = run_once()
+        if not worked:
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == '__main__':
+    run_worker()
@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+    python migrate.py                                   # schema changes, once per deploy
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+SECRET_KEY and DATABASE_URL must be set (in the environment or .env).
+gunicorn.conf.py imports the app once in the master and warms up each
+worker after it forks. Other WSGI servers can serve ``application`` as is:
+the first /readyz probe (or request to it) runs the warm-up.
+"""
+from app import app as application